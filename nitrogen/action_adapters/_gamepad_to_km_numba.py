@@ -0,0 +1,69 @@
+"""
+Numba kernel behind `gamepad_actions_to_km_batch`.
+
+Only imported when numba is installed; `gamepad_to_km` falls back to the
+NumPy implementation otherwise.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numba import njit, prange
+
+# fastmath without nnan/ninf: NaN and inf keep IEEE semantics so the kernel
+# agrees with the NumPy path (and mouse_max=inf works as "no limit").
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+@njit(cache=True, fastmath=_FASTMATH, parallel=True)
+def gamepad_batch_kernel(
+    lx,
+    ly,
+    rx,
+    ry,
+    triggers,
+    trigger_masks,
+    mask_d,
+    mask_a,
+    mask_w,
+    mask_s,
+    axis_scale,
+    trigger_scale,
+    axis_deadzone,
+    mouse_sens,
+    mouse_max,
+    trigger_threshold,
+    out_keys,
+    out_mouse_dx,
+    out_mouse_dy,
+    out_mouse_buttons,
+):
+    n = out_keys.shape[0]
+    n_triggers = trigger_masks.shape[0]
+    inv_axis = 1.0 / axis_scale
+    inv_trigger = 1.0 / trigger_scale
+    for i in prange(n):
+        keys = out_keys[i]
+        x = min(max(lx[i], -axis_scale), axis_scale) * inv_axis
+        y = min(max(ly[i], -axis_scale), axis_scale) * inv_axis
+        if x > axis_deadzone:
+            keys |= mask_d
+        elif x < -axis_deadzone:
+            keys |= mask_a
+        if y > axis_deadzone:
+            keys |= mask_w
+        elif y < -axis_deadzone:
+            keys |= mask_s
+        out_keys[i] = keys
+
+        buttons = 0
+        for j in range(n_triggers):
+            value = min(max(triggers[j, i], 0.0), trigger_scale) * inv_trigger
+            if value >= trigger_threshold:
+                buttons |= trigger_masks[j]
+        out_mouse_buttons[i] = buttons
+
+        x = min(max(rx[i], -axis_scale), axis_scale) * inv_axis
+        y = min(max(ry[i], -axis_scale), axis_scale) * inv_axis
+        out_mouse_dx[i] = np.int16(min(max(np.rint(x * mouse_sens), -mouse_max), mouse_max))
+        out_mouse_dy[i] = np.int16(min(max(np.rint(-y * mouse_sens), -mouse_max), mouse_max))
@@ -1,9 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Mapping
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Sequence
+
+import numpy as np
+
+from nitrogen.input.keymap import DEFAULT_KM_KEYS, DEFAULT_MOUSE_BUTTONS
+
+try:
+    from nitrogen.action_adapters._gamepad_to_km_numba import gamepad_batch_kernel as _numba_batch_kernel
+except Exception:
+    _numba_batch_kernel = None
 
 AXIS_SCALE = 32767.0
 TRIGGER_SCALE = 255.0
+_INV_AXIS_SCALE = 1.0 / AXIS_SCALE
+_INV_TRIGGER_SCALE = 1.0 / TRIGGER_SCALE
+# Below this batch size the parallel JIT kernel's thread fan-out costs more
+# than it saves.
+_NUMBA_MIN_BATCH = 1024
 
 DEFAULT_BUTTON_MAP = {
     "SOUTH": "space",
@@ -28,7 +43,59 @@ DEFAULT_TRIGGER_MAP = {
 }
 
 
-def _value_from_action(value: Any) -> float:
+def km_key_order(button_map: Mapping[str, str] | None = None) -> tuple[str, ...]:
+    """Bit order of the packed ``keys`` column produced by the batch API."""
+    button_map = button_map or DEFAULT_BUTTON_MAP
+    return tuple(sorted(set(button_map.values()) | {"w", "a", "s", "d"}))
+
+
+def km_mouse_button_order(trigger_map: Mapping[str, str] | None = None) -> tuple[str, ...]:
+    """Bit order of the packed ``mouse_buttons`` column produced by the batch API."""
+    trigger_map = trigger_map or DEFAULT_TRIGGER_MAP
+    return tuple(sorted(set(trigger_map.values())))
+
+
+_DEFAULT_BUTTON_ITEMS = tuple(DEFAULT_BUTTON_MAP.items())
+_DEFAULT_TRIGGER_ITEMS = tuple(DEFAULT_TRIGGER_MAP.items())
+_DEFAULT_KM_KEYS = tuple(DEFAULT_KM_KEYS)
+_DEFAULT_MOUSE_BUTTONS = tuple(DEFAULT_MOUSE_BUTTONS)
+
+
+@lru_cache(maxsize=8)
+def _km_layout(
+    key_list: tuple[str, ...],
+    mouse_button_list: tuple[str, ...],
+    button_items: tuple[tuple[str, str], ...],
+    trigger_items: tuple[tuple[str, str], ...],
+) -> tuple[dict[str, int], dict[str, int]]:
+    """Mask positions for a key/mouse-button layout, built (and checked) once."""
+    key_pos = {k: i for i, k in enumerate(key_list)}
+    mouse_pos = {b: i for i, b in enumerate(mouse_button_list)}
+    mapped_keys = {key for _, key in button_items} | {"w", "a", "s", "d"}
+    missing_keys = sorted(mapped_keys - key_pos.keys())
+    missing_buttons = sorted({button for _, button in trigger_items} - mouse_pos.keys())
+    if missing_keys or missing_buttons:
+        print(
+            "Warning: gamepad->KM mapping uses inputs outside the KM layout; they will not be sent: "
+            f"keys={missing_keys} mouse_buttons={missing_buttons}"
+        )
+    return key_pos, mouse_pos
+
+
+@lru_cache(maxsize=8)
+def _present_buttons(
+    button_items: tuple[tuple[str, str], ...],
+    action_keys: frozenset,
+) -> tuple[tuple[str, str], ...]:
+    """(button, key) pairs for the mapped buttons the action actually carries.
+
+    Policies emit the same action shape every step, so this is a cache hit in
+    practice and the per-step loop skips buttons that are never present.
+    """
+    return tuple((btn, key) for btn, key in button_items if btn in action_keys)
+
+
+def _value_from_action_slow(value: Any) -> float:
     if value is None:
         return 0.0
     if hasattr(value, "__len__") and not isinstance(value, (str, bytes)):
@@ -42,22 +109,55 @@ def _value_from_action(value: Any) -> float:
         return 0.0
 
 
+def _ndarray0(value: np.ndarray) -> float:
+    try:
+        if value.ndim == 0:
+            return float(value.item())
+        return float(value[0]) if len(value) else 0.0
+    except (TypeError, ValueError):
+        # Nested or non-numeric contents: same result as the generic path.
+        return _value_from_action_slow(value)
+
+
+def _sequence0(value: Any) -> float:
+    try:
+        return float(value[0]) if value else 0.0
+    except (TypeError, ValueError):
+        return _value_from_action_slow(value)
+
+
+# Exact-type fast paths; anything else (subclasses, numpy scalars of other
+# dtypes, strings) goes through the generic conversion.
+_DISPATCH = {
+    int: float,
+    float: float,
+    bool: float,
+    np.ndarray: _ndarray0,
+    list: _sequence0,
+    tuple: _sequence0,
+    type(None): lambda value: 0.0,
+    np.int16: float,
+    np.uint8: float,
+    np.int64: float,
+    np.float32: float,
+    np.float64: float,
+}
+
+
+def _value_from_action(value: Any) -> float:
+    fn = _DISPATCH.get(type(value))
+    if fn is not None:
+        return fn(value)
+    return _value_from_action_slow(value)
+
+
 def _axis_norm(value: Any) -> float:
-    raw = _value_from_action(value)
-    if raw > AXIS_SCALE:
-        raw = AXIS_SCALE
-    if raw < -AXIS_SCALE:
-        raw = -AXIS_SCALE
-    return raw / AXIS_SCALE
+    # raw goes first so a NaN propagates instead of clamping to the bound.
+    return max(min(_value_from_action(value), AXIS_SCALE), -AXIS_SCALE) * _INV_AXIS_SCALE
 
 
 def _trigger_norm(value: Any) -> float:
-    raw = _value_from_action(value)
-    if raw > TRIGGER_SCALE:
-        raw = TRIGGER_SCALE
-    if raw < 0:
-        raw = 0
-    return raw / TRIGGER_SCALE
+    return max(min(_value_from_action(value), TRIGGER_SCALE), 0.0) * _INV_TRIGGER_SCALE
 
 
 def gamepad_action_to_km(
@@ -68,31 +168,54 @@ def gamepad_action_to_km(
     axis_deadzone: float = 0.2,
     mouse_max: int | None = None,
     trigger_threshold: float = 0.1,
+    key_list: Sequence[str] | None = None,
+    mouse_button_list: Sequence[str] | None = None,
 ) -> Dict[str, Any]:
+    """
+    Map one gamepad action to a keyboard/mouse action.
+
+    ``keys`` and ``mouse_buttons`` are uint8 masks aligned with `key_list`
+    (default `DEFAULT_KM_KEYS`) and `mouse_button_list` (default
+    `DEFAULT_MOUSE_BUTTONS`), the layout `KeyboardMouseController` and the
+    km action space use. Mapped keys missing from the list are not sent
+    (a warning is printed the first time a layout is used).
+    """
     button_map = button_map or DEFAULT_BUTTON_MAP
     trigger_map = trigger_map or DEFAULT_TRIGGER_MAP
 
-    keys = set()
-    mouse_buttons = set()
+    button_items = _DEFAULT_BUTTON_ITEMS if button_map is DEFAULT_BUTTON_MAP else tuple(button_map.items())
+    trigger_items = _DEFAULT_TRIGGER_ITEMS if trigger_map is DEFAULT_TRIGGER_MAP else tuple(trigger_map.items())
+    key_pos, mouse_pos = _km_layout(
+        _DEFAULT_KM_KEYS if key_list is None else tuple(key_list),
+        _DEFAULT_MOUSE_BUTTONS if mouse_button_list is None else tuple(mouse_button_list),
+        button_items,
+        trigger_items,
+    )
 
-    for btn, key in button_map.items():
-        if _value_from_action(action.get(btn, 0)) > 0:
-            keys.add(key)
+    # Flags are set in a bytearray and exposed as ndarrays without a copy.
+    keys = bytearray(len(key_pos))
+    mouse_buttons = bytearray(len(mouse_pos))
 
-    for trig, button in trigger_map.items():
+    for btn, key in _present_buttons(button_items, frozenset(action)):
+        if _value_from_action(action[btn]) > 0:
+            index = key_pos.get(key)
+            if index is not None:
+                keys[index] = 1
+
+    for trig, button in trigger_items:
         if _trigger_norm(action.get(trig, 0)) >= trigger_threshold:
-            mouse_buttons.add(button)
+            index = mouse_pos.get(button)
+            if index is not None:
+                mouse_buttons[index] = 1
 
     lx = _axis_norm(action.get("AXIS_LEFTX", 0))
     ly = _axis_norm(action.get("AXIS_LEFTY", 0))
-    if lx > axis_deadzone:
-        keys.add("d")
-    elif lx < -axis_deadzone:
-        keys.add("a")
-    if ly > axis_deadzone:
-        keys.add("w")
-    elif ly < -axis_deadzone:
-        keys.add("s")
+    stick_key = "d" if lx > axis_deadzone else "a" if lx < -axis_deadzone else None
+    if stick_key is not None and stick_key in key_pos:
+        keys[key_pos[stick_key]] = 1
+    stick_key = "w" if ly > axis_deadzone else "s" if ly < -axis_deadzone else None
+    if stick_key is not None and stick_key in key_pos:
+        keys[key_pos[stick_key]] = 1
 
     rx = _axis_norm(action.get("AXIS_RIGHTX", 0))
     ry = _axis_norm(action.get("AXIS_RIGHTY", 0))
@@ -110,9 +233,161 @@ def gamepad_action_to_km(
             mouse_dy = -mouse_max
 
     return {
-        "keys": sorted(keys),
+        "keys": np.frombuffer(keys, dtype=np.uint8),
         "mouse_dx": mouse_dx,
         "mouse_dy": mouse_dy,
-        "mouse_buttons": sorted(mouse_buttons),
+        "mouse_buttons": np.frombuffer(mouse_buttons, dtype=np.uint8),
         "mouse_wheel": 0,
     }
+
+
+def km_action_names(
+    action: Mapping[str, Any],
+    key_list: Sequence[str] | None = None,
+    mouse_button_list: Sequence[str] | None = None,
+) -> Dict[str, Any]:
+    """
+    Copy of a `gamepad_action_to_km` result with ``keys`` and
+    ``mouse_buttons`` as sorted name lists, the schema the action logs use.
+    """
+    key_list = DEFAULT_KM_KEYS if key_list is None else key_list
+    mouse_button_list = DEFAULT_MOUSE_BUTTONS if mouse_button_list is None else mouse_button_list
+    return {
+        **action,
+        "keys": sorted(k for k, pressed in zip(key_list, action["keys"].tolist()) if pressed),
+        "mouse_buttons": sorted(b for b, pressed in zip(mouse_button_list, action["mouse_buttons"].tolist()) if pressed),
+    }
+
+
+def _column(actions: Mapping[str, Any], name: str, n: int) -> np.ndarray:
+    value = actions.get(name)
+    if value is None:
+        return np.zeros(n, dtype=np.float64)
+    return np.broadcast_to(np.asarray(value, dtype=np.float64).reshape(-1), (n,))
+
+
+def gamepad_actions_to_km_batch(
+    actions: Mapping[str, np.ndarray],
+    button_map: Mapping[str, str] | None = None,
+    trigger_map: Mapping[str, str] | None = None,
+    mouse_sens: float = 15.0,
+    axis_deadzone: float = 0.2,
+    mouse_max: int | None = None,
+    trigger_threshold: float = 0.1,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized `gamepad_action_to_km` over column arrays of shape (N,).
+
+    Missing columns are treated as zeros. Pressed keys and mouse buttons are
+    returned as bitmask columns whose bit i corresponds to `km_key_order()[i]`
+    and `km_mouse_button_order()[i]`; use `km_batch_to_actions` to decode them.
+    Large batches run through a Numba kernel when numba is installed.
+    """
+    button_map = button_map or DEFAULT_BUTTON_MAP
+    trigger_map = trigger_map or DEFAULT_TRIGGER_MAP
+    key_bit = {k: i for i, k in enumerate(km_key_order(button_map))}
+    mouse_bit = {b: i for i, b in enumerate(km_mouse_button_order(trigger_map))}
+
+    lengths = [np.size(v) for v in actions.values() if v is not None]
+    n = max(lengths) if lengths else 0
+
+    keys = np.zeros(n, dtype=np.uint32)
+    for btn, key in button_map.items():
+        if btn in actions:
+            pressed = _column(actions, btn, n) > 0
+            keys |= pressed.astype(np.uint32) << np.uint32(key_bit[key])
+
+    if _numba_batch_kernel is not None and n >= _NUMBA_MIN_BATCH:
+        present = [(trig, button) for trig, button in trigger_map.items() if trig in actions]
+        triggers = np.zeros((len(present), n), dtype=np.float64)
+        for j, (trig, _) in enumerate(present):
+            triggers[j] = _column(actions, trig, n)
+        trigger_masks = np.array([1 << mouse_bit[button] for _, button in present], dtype=np.uint8)
+        mouse_buttons = np.zeros(n, dtype=np.uint8)
+        mouse_dx = np.empty(n, dtype=np.int16)
+        mouse_dy = np.empty(n, dtype=np.int16)
+        _numba_batch_kernel(
+            _column(actions, "AXIS_LEFTX", n),
+            _column(actions, "AXIS_LEFTY", n),
+            _column(actions, "AXIS_RIGHTX", n),
+            _column(actions, "AXIS_RIGHTY", n),
+            triggers,
+            trigger_masks,
+            1 << key_bit["d"],
+            1 << key_bit["a"],
+            1 << key_bit["w"],
+            1 << key_bit["s"],
+            AXIS_SCALE,
+            TRIGGER_SCALE,
+            float(axis_deadzone),
+            float(mouse_sens),
+            float(mouse_max) if mouse_max is not None else np.inf,
+            float(trigger_threshold),
+            keys,
+            mouse_dx,
+            mouse_dy,
+            mouse_buttons,
+        )
+        return {
+            "keys": keys,
+            "mouse_dx": mouse_dx,
+            "mouse_dy": mouse_dy,
+            "mouse_buttons": mouse_buttons,
+            "mouse_wheel": np.zeros(n, dtype=np.int16),
+        }
+
+    mouse_buttons = np.zeros(n, dtype=np.uint8)
+    for trig, button in trigger_map.items():
+        if trig in actions:
+            value = np.clip(_column(actions, trig, n), 0.0, TRIGGER_SCALE) * _INV_TRIGGER_SCALE
+            pressed = value >= trigger_threshold
+            mouse_buttons |= pressed.astype(np.uint8) << np.uint8(mouse_bit[button])
+
+    lx = np.clip(_column(actions, "AXIS_LEFTX", n), -AXIS_SCALE, AXIS_SCALE) * _INV_AXIS_SCALE
+    ly = np.clip(_column(actions, "AXIS_LEFTY", n), -AXIS_SCALE, AXIS_SCALE) * _INV_AXIS_SCALE
+    keys |= (lx > axis_deadzone).astype(np.uint32) << np.uint32(key_bit["d"])
+    keys |= (lx < -axis_deadzone).astype(np.uint32) << np.uint32(key_bit["a"])
+    keys |= (ly > axis_deadzone).astype(np.uint32) << np.uint32(key_bit["w"])
+    keys |= (ly < -axis_deadzone).astype(np.uint32) << np.uint32(key_bit["s"])
+
+    rx = np.clip(_column(actions, "AXIS_RIGHTX", n), -AXIS_SCALE, AXIS_SCALE) * _INV_AXIS_SCALE
+    ry = np.clip(_column(actions, "AXIS_RIGHTY", n), -AXIS_SCALE, AXIS_SCALE) * _INV_AXIS_SCALE
+    mouse_dx = np.rint(rx * mouse_sens)
+    mouse_dy = np.rint(-ry * mouse_sens)
+    if mouse_max is not None:
+        np.clip(mouse_dx, -mouse_max, mouse_max, out=mouse_dx)
+        np.clip(mouse_dy, -mouse_max, mouse_max, out=mouse_dy)
+
+    return {
+        "keys": keys,
+        "mouse_dx": mouse_dx.astype(np.int16),
+        "mouse_dy": mouse_dy.astype(np.int16),
+        "mouse_buttons": mouse_buttons,
+        "mouse_wheel": np.zeros(n, dtype=np.int16),
+    }
+
+
+def km_batch_to_actions(
+    batch: Mapping[str, np.ndarray],
+    button_map: Mapping[str, str] | None = None,
+    trigger_map: Mapping[str, str] | None = None,
+) -> list[Dict[str, Any]]:
+    """Decode a `gamepad_actions_to_km_batch` result into per-step KM actions."""
+    key_order = km_key_order(button_map)
+    mouse_order = km_mouse_button_order(trigger_map)
+    actions = []
+    for keys, dx, dy, buttons, wheel in zip(
+        batch["keys"].tolist(),
+        batch["mouse_dx"].tolist(),
+        batch["mouse_dy"].tolist(),
+        batch["mouse_buttons"].tolist(),
+        batch["mouse_wheel"].tolist(),
+    ):
+        actions.append({
+            "keys": [k for i, k in enumerate(key_order) if keys >> i & 1],
+            "mouse_dx": dx,
+            "mouse_dy": dy,
+            "mouse_buttons": [b for i, b in enumerate(mouse_order) if buttons >> i & 1],
+            "mouse_wheel": wheel,
+        })
+    return actions
@@ -1,26 +1,149 @@
 from __future__ import annotations
 
+import atexit
+import ctypes
 import os
 import time
 import platform
-from typing import Any, Mapping
+import threading
+from ctypes import wintypes
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Mapping
 
+import cv2
 import numpy as np
-import psutil
-import pywinctl as pwc
 from gymnasium import Env
 from gymnasium.spaces import Box, Dict, Discrete, MultiBinary
-from PIL import Image
 
 from nitrogen.input.base import InputController
-from nitrogen.process_picker import parse_process_spec, process_name_matches
 
-assert platform.system().lower() == "windows", "This module is only supported on Windows."
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+TH32CS_SNAPPROCESS = 0x00000002
+CREATE_WAITABLE_TIMER_HIGH_RESOLUTION = 0x00000002
+TIMER_ALL_ACCESS = 0x001F0003
+INFINITE = 0xFFFFFFFF
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+
+class PROCESSENTRY32W(ctypes.Structure):
+    _fields_ = [
+        ("dwSize", wintypes.DWORD),
+        ("cntUsage", wintypes.DWORD),
+        ("th32ProcessID", wintypes.DWORD),
+        ("th32DefaultHeapID", ctypes.c_size_t),
+        ("th32ModuleID", wintypes.DWORD),
+        ("cntThreads", wintypes.DWORD),
+        ("th32ParentProcessID", wintypes.DWORD),
+        ("pcPriClassBase", wintypes.LONG),
+        ("dwFlags", wintypes.DWORD),
+        ("szExeFile", wintypes.WCHAR * 260),
+    ]
+
+
+@lru_cache(maxsize=None)
+def _get_win32() -> SimpleNamespace:
+    """pywin32 modules, imported on first use rather than at module import."""
+    import win32api
+    import win32con
+    import win32gui
+    import win32process
+
+    return SimpleNamespace(
+        win32api=win32api,
+        win32con=win32con,
+        win32gui=win32gui,
+        win32process=win32process,
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_kernel32() -> ctypes.WinDLL:
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.argtypes = (wintypes.DWORD, wintypes.DWORD)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.Process32FirstW.argtypes = (wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W))
+    kernel32.Process32FirstW.restype = wintypes.BOOL
+    kernel32.Process32NextW.argtypes = (wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W))
+    kernel32.Process32NextW.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    kernel32.CreateWaitableTimerExW.argtypes = (
+        ctypes.c_void_p,
+        wintypes.LPCWSTR,
+        wintypes.DWORD,
+        wintypes.DWORD,
+    )
+    kernel32.CreateWaitableTimerExW.restype = wintypes.HANDLE
+    kernel32.SetWaitableTimer.argtypes = (
+        wintypes.HANDLE,
+        ctypes.POINTER(wintypes.LARGE_INTEGER),
+        wintypes.LONG,
+        ctypes.c_void_p,
+        ctypes.c_void_p,
+        wintypes.BOOL,
+    )
+    kernel32.SetWaitableTimer.restype = wintypes.BOOL
+    kernel32.WaitForSingleObject.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+    kernel32.WaitForSingleObject.restype = wintypes.DWORD
+    return kernel32
+
+
+_timer_period_set = False
+
+
+def _begin_timer_period() -> None:
+    """Raise the system timer resolution to 1 ms for the rest of the process."""
+    global _timer_period_set
+    if _timer_period_set:
+        return
+    try:
+        winmm = ctypes.WinDLL("winmm")
+        if winmm.timeBeginPeriod(1) == 0:
+            atexit.register(winmm.timeEndPeriod, 1)
+            _timer_period_set = True
+    except OSError:
+        pass
+
+
+class _WaitableTimer:
+    """
+    High-resolution one-shot sleep backed by a Win32 waitable timer.
+
+    Falls back to time.sleep when the high-resolution flag is unsupported
+    (Windows 10 before 1803).
+    """
 
-import win32process
-import win32gui
-import win32api
-import win32con
+    def __init__(self) -> None:
+        self._kernel32 = _get_kernel32()
+        self._handle = self._kernel32.CreateWaitableTimerExW(
+            None,
+            None,
+            CREATE_WAITABLE_TIMER_HIGH_RESOLUTION,
+            TIMER_ALL_ACCESS,
+        )
+        self._due = wintypes.LARGE_INTEGER()
+
+    def sleep(self, duration: float) -> None:
+        if duration <= 0:
+            return
+        if not self._handle:
+            time.sleep(duration)
+            return
+        # Negative due time = relative, in 100 ns units.
+        self._due.value = -int(duration * 10_000_000)
+        if not self._kernel32.SetWaitableTimer(self._handle, ctypes.byref(self._due), 0, None, None, False):
+            time.sleep(duration)
+            return
+        self._kernel32.WaitForSingleObject(self._handle, INFINITE)
+
+    def close(self) -> None:
+        if self._handle:
+            self._kernel32.CloseHandle(self._handle)
+            self._handle = None
 
 
 def _env_flag(name: str, default: bool = False) -> bool:
@@ -30,15 +153,18 @@ def _env_flag(name: str, default: bool = False) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+_PROXY_WINDOW_KEYWORDS = ("d3dproxywindow", "proxy", "helper", "overlay")
+
+
 def _select_window_name(windows: list[dict]) -> str | None:
     window_name = None
     if windows:
         if len(windows) > 1:
             print(f"Multiple windows found: {[win['title'] for win in windows]}")
             print("Using heuristics to select the correct window...")
-        proxy_keywords = ["d3dproxywindow", "proxy", "helper", "overlay"]
         for win in windows:
-            if not any(keyword in win["title"].lower() for keyword in proxy_keywords):
+            title = win["title"].lower()
+            if not any(keyword in title for keyword in _PROXY_WINDOW_KEYWORDS):
                 window_name = win["title"]
                 break
         if window_name is None and windows:
@@ -46,29 +172,85 @@ def _select_window_name(windows: list[dict]) -> str | None:
     return window_name
 
 
-def _windows_for_pid(pid: int) -> list[dict]:
-    windows: list[dict] = []
-
-    def enum_window_callback(hwnd, pid_to_find):
-        _, found_pid = win32process.GetWindowThreadProcessId(hwnd)
-        if found_pid == pid_to_find:
-            window_text = win32gui.GetWindowText(hwnd)
-            if window_text and win32gui.IsWindowVisible(hwnd):
-                windows.append({
-                    "hwnd": hwnd,
-                    "title": window_text,
-                    "visible": win32gui.IsWindowVisible(hwnd),
-                })
+def _windows_by_pid() -> dict[int, list[dict]]:
+    w = _get_win32()
+    windows: dict[int, list[dict]] = {}
+
+    def enum_window_callback(hwnd, _):
+        if not w.win32gui.IsWindowVisible(hwnd):
+            return True
+        window_text = w.win32gui.GetWindowText(hwnd)
+        if window_text:
+            _, found_pid = w.win32process.GetWindowThreadProcessId(hwnd)
+            windows.setdefault(found_pid, []).append({
+                "hwnd": hwnd,
+                "title": window_text,
+                "visible": True,
+            })
         return True
 
     try:
-        win32gui.EnumWindows(enum_window_callback, pid)
+        w.win32gui.EnumWindows(enum_window_callback, None)
     except Exception:
         pass
 
     return windows
 
 
+def _windows_for_pid(pid: int) -> list[dict]:
+    return _windows_by_pid().get(pid, [])
+
+
+def _process_snapshot() -> list[tuple[int, str]]:
+    kernel32 = _get_kernel32()
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if not snapshot or snapshot == INVALID_HANDLE_VALUE:
+        raise ctypes.WinError(ctypes.get_last_error())
+    processes: list[tuple[int, str]] = []
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            processes.append((entry.th32ProcessID, entry.szExeFile))
+            ok = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    return processes
+
+
+def _process_architecture(pid: int) -> str:
+    w = _get_win32()
+    try:
+        process_handle = w.win32api.OpenProcess(
+            w.win32con.PROCESS_QUERY_INFORMATION,
+            False,
+            pid,
+        )
+        is_wow64 = w.win32process.IsWow64Process(process_handle)
+        w.win32api.CloseHandle(process_handle)
+        return "x86" if is_wow64 else "x64"
+    except Exception:
+        return "unknown"
+
+
+def _find_window(pid: int, title: str | None) -> int:
+    if not title:
+        return 0
+    w = _get_win32()
+    hwnd = w.win32gui.FindWindow(None, title)
+    if hwnd:
+        _, found_pid = w.win32process.GetWindowThreadProcessId(hwnd)
+        if found_pid == pid:
+            return hwnd
+    # Another process owns a window with the same title (or FindWindow
+    # missed it); fall back to the windows of the game process itself.
+    for win in _windows_for_pid(pid):
+        if win["title"] == title:
+            return win["hwnd"]
+    return 0
+
+
 def get_process_info(process_name: str) -> dict:
     """
     Get process information for a given process name on Windows.
@@ -80,27 +262,15 @@ def get_process_info(process_name: str) -> dict:
         dict: Dictionary containing PID, window_name, and architecture
               for the first matching process.
     """
+    from nitrogen.process_picker import parse_process_spec, process_name_matches
+
     results = []
 
+    processes = _process_snapshot()
     pid_override, normalized_name = parse_process_spec(process_name)
     if pid_override is not None:
-        try:
-            proc = psutil.Process(pid_override)
-        except Exception as exc:
-            raise ValueError(f"No process found with pid: {pid_override}") from exc
-
-        architecture = "unknown"
-        try:
-            process_handle = win32api.OpenProcess(
-                win32con.PROCESS_QUERY_INFORMATION,
-                False,
-                pid_override,
-            )
-            is_wow64 = win32process.IsWow64Process(process_handle)
-            win32api.CloseHandle(process_handle)
-            architecture = "x86" if is_wow64 else "x64"
-        except Exception:
-            architecture = "unknown"
+        if not any(pid == pid_override for pid, _ in processes):
+            raise ValueError(f"No process found with pid: {pid_override}")
 
         windows = _windows_for_pid(pid_override)
         window_name = _select_window_name(windows)
@@ -108,38 +278,24 @@ def get_process_info(process_name: str) -> dict:
         return {
             "pid": pid_override,
             "window_name": window_name,
-            "architecture": architecture,
+            "architecture": _process_architecture(pid_override),
         }
 
-    for proc in psutil.process_iter(["pid", "name"]):
-        try:
-            if proc.info["name"] and process_name_matches(normalized_name, proc.info["name"]):
-                pid = proc.info["pid"]
-
-                try:
-                    process_handle = win32api.OpenProcess(
-                        win32con.PROCESS_QUERY_INFORMATION,
-                        False,
-                        pid,
-                    )
-                    is_wow64 = win32process.IsWow64Process(process_handle)
-                    win32api.CloseHandle(process_handle)
-                    architecture = "x86" if is_wow64 else "x64"
-                except Exception:
-                    architecture = "unknown"
-
-                windows = _windows_for_pid(pid)
-                window_name = _select_window_name(windows)
-
-                results.append({
-                    "pid": pid,
-                    "window_name": window_name,
-                    "architecture": architecture,
-                    "window_count": len(windows),
-                })
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+    pid_to_windows = _windows_by_pid()
+    # Collect every match rather than stopping at the first: games often
+    # run a launcher or crash handler under the same exe name, and the
+    # heuristic below prefers the one that owns a visible window.
+    for pid, name in processes:
+        if name and process_name_matches(normalized_name, name):
+            windows = pid_to_windows.get(pid, [])
+            window_name = _select_window_name(windows)
+
+            results.append({
+                "pid": pid,
+                "window_name": window_name,
+                "architecture": _process_architecture(pid),
+                "window_count": len(windows),
+            })
 
     if len(results) == 0:
         raise ValueError(f"No process found with name: {process_name}")
@@ -161,6 +317,8 @@ def get_process_info(process_name: str) -> dict:
 
 
 class PyautoguiScreenshotBackend:
+    color_format = "RGB"
+
     def __init__(self, bbox: tuple[int, int, int, int]):
         import pyautogui
         self.pyautogui = pyautogui
@@ -169,34 +327,99 @@ class PyautoguiScreenshotBackend:
     def screenshot(self) -> Image.Image:
         return self.pyautogui.screenshot(region=self.bbox)
 
+    def screenshot_array(self) -> np.ndarray:
+        return np.asarray(self.screenshot().convert("RGB"))
+
+    def request_async(self) -> None:
+        pass
+
     def close(self) -> None:
         pass
 
 
 class DxcamScreenshotBackend:
+    # Frames are kept in DXGI's native layout; GameEnv.render() does the one
+    # conversion to RGB together with the resize.
+    color_format = "BGRA"
+
     def __init__(self, bbox: tuple[int, int, int, int], fps: int):
-        import dxcam
-        self.camera = dxcam.create()
+        # bettercam is a dxcam fork with the same API whose capture thread
+        # waits in AcquireNextFrame with a timeout instead of re-polling it
+        # with 0 ms, which burns a core and stutters when the screen moves.
+        try:
+            import bettercam as dxcam
+        except ImportError:
+            import dxcam
+        self.camera = dxcam.create(output_color=self.color_format)
         self.bbox = bbox
-        self.last_screenshot = None
         self.camera.start(region=self.bbox, target_fps=fps, video_mode=True)
+        self._frame_interval = 1.0 / max(1, fps)
+
+        # get_latest_frame() blocks until DXGI hands over a new frame, so a
+        # daemon thread keeps pulling frames and publishes the newest one in a
+        # single slot; screenshot() never waits on the duplication API.
+        self._cond = threading.Condition()
+        self._latest: np.ndarray | None = None
+        self._seq = 0
+        self._requested_seq: int | None = None
+        self._first_frame = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, name="dxcam-pump", daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        while not self._stop.is_set():
+            try:
+                frame = self.camera.get_latest_frame()
+            except Exception:
+                if self._stop.is_set():
+                    break
+                # Back off for a frame rather than spinning on a lost output.
+                self._stop.wait(self._frame_interval)
+                continue
+            if frame is None:
+                continue
+            # dxcam returns a fresh array per call, so publishing the
+            # reference is safe: nothing writes into it afterwards.
+            with self._cond:
+                self._latest = frame
+                self._seq += 1
+                self._cond.notify_all()
+            self._first_frame.set()
+
+    def request_async(self) -> None:
+        """Mark that the next screenshot should be captured after this point."""
+        with self._cond:
+            self._requested_seq = self._seq
+
+    def screenshot_array(self) -> np.ndarray:
+        self._first_frame.wait(timeout=1.0)
+        with self._cond:
+            requested = self._requested_seq
+            if requested is not None:
+                self._requested_seq = None
+                # Normally already satisfied after the step's sleep; bounded
+                # to one frame so a static screen (no new DXGI frames) never
+                # stalls the loop.
+                self._cond.wait_for(lambda: self._seq > requested, timeout=self._frame_interval)
+            frame = self._latest
+        if frame is None:
+            print("DXCAM failed to capture frame, using a black frame")
+            return np.zeros((self.bbox[3], self.bbox[2], 4), dtype=np.uint8)
+        return frame
 
     def screenshot(self) -> Image.Image:
-        screenshot = self.camera.get_latest_frame()
-        if screenshot is None:
-            print("DXCAM failed to capture frame, trying to use the latest screenshot")
-            if self.last_screenshot is not None:
-                return self.last_screenshot
-            return Image.new("RGB", (self.bbox[2], self.bbox[3]), (0, 0, 0))
-        screenshot = Image.fromarray(screenshot)
-        self.last_screenshot = screenshot
-        return screenshot
+        from PIL import Image
+
+        return Image.fromarray(cv2.cvtColor(self.screenshot_array(), cv2.COLOR_BGRA2RGB))
 
     def close(self) -> None:
+        self._stop.set()
         try:
             self.camera.stop()
         except Exception:
             pass
+        self._thread.join(timeout=0.5)
 
 
 class GameEnv(Env):
@@ -265,6 +488,7 @@ class GameEnv(Env):
                     dry_run=self.disable_input,
                     key_list=self.km_key_list,
                     mouse_buttons=self.km_mouse_buttons,
+                    async_input=_env_flag("NG_KM_ASYNC_INPUT", False),
                 )
                 self.controller_kind = "km"
             else:
@@ -290,20 +514,23 @@ class GameEnv(Env):
         )
 
         self.action_space = self._build_action_space()
+        self._obs_buf = np.empty(self.observation_space.shape, dtype=np.uint8)
+        self._bgra_buf = np.empty((self.image_height, self.image_width, 4), dtype=np.uint8)
 
-        windows = pwc.getAllWindows()
-        self.game_window = None
-        for window in windows:
-            if window.title == self.game_window_name:
-                self.game_window = window
-                break
-
-        if not self.game_window:
+        self.game_hwnd = _find_window(self.game_pid, self.game_window_name)
+        if not self.game_hwnd:
             raise RuntimeError(f"No window found with game name: {self.game}")
 
-        self.game_window.activate()
-        l, t, r, b = self.game_window.left, self.game_window.top, self.game_window.right, self.game_window.bottom
+        w = _get_win32()
+        try:
+            if w.win32gui.IsIconic(self.game_hwnd):
+                w.win32gui.ShowWindow(self.game_hwnd, w.win32con.SW_RESTORE)
+            w.win32gui.SetForegroundWindow(self.game_hwnd)
+        except Exception as exc:
+            print(f"Warning: could not activate game window: {exc}")
+        l, t, r, b = w.win32gui.GetWindowRect(self.game_hwnd)
         self.bbox = (l, t, r - l, b - t)
+        self._target_size = (self.image_width, self.image_height)
 
         self.speedhack_client = None
         if self.enable_speedhack:
@@ -323,6 +550,11 @@ class GameEnv(Env):
         else:
             raise ValueError("Unsupported screenshot backend. Use 'dxcam' or 'pyautogui'.")
 
+        # Created last: a failed process/window lookup above must not leak
+        # the timer handle.
+        _begin_timer_period()
+        self._timer = _WaitableTimer()
+
     def _build_action_space(self) -> Dict:
         if self.controller_kind == "km":
             from nitrogen.input.keymap import (
@@ -391,13 +623,20 @@ class GameEnv(Env):
 
     def perform_action(self, action: Mapping[str, Any], duration: float) -> None:
         self.controller.step(action)
+        # The capture pump keeps running while we sleep; render() then only
+        # has to pick up a frame grabbed after this input was sent.
+        self.screenshot_backend.request_async()
 
         if self.enable_speedhack and self.async_mode:
             self.unpause()
-            time.sleep(duration)
+            self._timer.sleep(duration)
             self.pause()
         else:
-            time.sleep(duration)
+            self._timer.sleep(duration)
+
+    def sleep(self, duration: float) -> None:
+        """Sleep on the env's high-resolution timer (1 ms period is already raised)."""
+        self._timer.sleep(duration)
 
     def step(self, action: Mapping[str, Any], step_duration: float | None = None):
         duration = step_duration if step_duration is not None else self.step_duration
@@ -421,16 +660,34 @@ class GameEnv(Env):
         try:
             self.controller.close()
         finally:
+            self._timer.close()
             if hasattr(self.screenshot_backend, "close"):
                 try:
                     self.screenshot_backend.close()
                 except Exception:
                     pass
 
-    def render(self) -> Image.Image:
-        screenshot = self.screenshot_backend.screenshot()
-        screenshot = screenshot.resize((self.image_width, self.image_height))
-        return screenshot
+    def render(self) -> np.ndarray:
+        """
+        Return the current frame as an (H, W, 3) uint8 RGB array.
+
+        The array is reused: it is only valid until the next render()/step()
+        call, so copy it if it has to outlive the step.
+        """
+        backend = self.screenshot_backend
+        frame = backend.screenshot_array()
+        # Captures usually already match the requested size; only resample
+        # when they don't. The frame shape is checked rather than the bbox
+        # because DPI scaling can make the two differ.
+        needs_resize = frame.shape[1] != self._target_size[0] or frame.shape[0] != self._target_size[1]
+        if getattr(backend, "color_format", "RGB") == "BGRA":
+            # Resample first so the color swizzle only touches target-size pixels.
+            if needs_resize:
+                frame = cv2.resize(frame, self._target_size, dst=self._bgra_buf, interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB, dst=self._obs_buf)
+        if needs_resize:
+            return cv2.resize(frame, self._target_size, dst=self._obs_buf, interpolation=cv2.INTER_AREA)
+        return frame
 
 
 class GamepadEnv(GameEnv):
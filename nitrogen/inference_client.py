@@ -1,9 +1,70 @@
 import time
-import pickle
+import threading
 
+import msgpack
 import numpy as np
 import zmq
 
+# Wire format: a msgpack header frame followed by one raw frame per ndarray.
+# In the header each array is an ext record (frame index, dtype, shape);
+# the receiver wraps the frame with np.frombuffer instead of copying it.
+_NDARRAY_EXT = 1
+
+
+class _MessagePacker:
+    """A reusable msgpack.Packer whose `default` hook collects the arrays."""
+
+    def __init__(self) -> None:
+        self._buffers: list = []
+        self._packer = msgpack.Packer(default=self._default)
+        self._ext_packer = msgpack.Packer()
+
+    def _default(self, obj):
+        if isinstance(obj, np.ndarray):
+            arr = np.ascontiguousarray(obj)
+            self._buffers.append(arr)
+            meta = self._ext_packer.pack([len(self._buffers) - 1, arr.dtype.str, arr.shape])
+            return msgpack.ExtType(_NDARRAY_EXT, meta)
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+    def pack(self, msg: dict) -> list:
+        self._buffers = []
+        header = self._packer.pack(msg)
+        return [header, *self._buffers]
+
+
+# Packers are not thread-safe; the server packs from several worker threads.
+_packers = threading.local()
+
+
+def pack_message(msg: dict) -> list:
+    """
+    Split `msg` into ZMQ frames: msgpack header, then array buffers. This is
+    the out-of-band layout pickle protocol 5 offers: with send_multipart(...,
+    copy=False), arrays above pyzmq's copy threshold (64 KiB, e.g. the
+    image) are handed to ZMQ without any Python-side copy.
+    """
+    packer = getattr(_packers, "packer", None)
+    if packer is None:
+        packer = _packers.packer = _MessagePacker()
+    return packer.pack(msg)
+
+
+def unpack_message(frames: list) -> dict:
+    """Inverse of `pack_message`; arrays are views of the frames, not copies."""
+    buffers = frames[1:]
+
+    def ext_hook(code, data):
+        if code != _NDARRAY_EXT:
+            return msgpack.ExtType(code, data)
+        index, dtype, shape = msgpack.unpackb(data)
+        return np.frombuffer(buffers[index], dtype=np.dtype(dtype)).reshape(shape)
+
+    return msgpack.unpackb(frames[0], ext_hook=ext_hook)
+
+
 class ModelClient:
     """Client for model inference server."""
     
@@ -34,18 +95,18 @@ class ModelClient:
             image: numpy array (H, W, 3) in RGB format
             
         Returns:
-            List of action dicts, each containing:
-                - j_left: [x, y] left joystick position
-                - j_right: [x, y] right joystick position  
-                - buttons: list of button values
+            Dict of float32 arrays, one row per predicted action:
+                - j_left: (N, 2) left joystick positions
+                - j_right: (N, 2) right joystick positions
+                - buttons: (N, n_buttons) button values
         """
         request = {
             "type": "predict",
             "image": image
         }
         
-        self.socket.send(pickle.dumps(request))
-        response = pickle.loads(self.socket.recv())
+        self.socket.send_multipart(pack_message(request), copy=False)
+        response = unpack_message(self.socket.recv_multipart(copy=False))
         
         if response["status"] != "ok":
             raise RuntimeError(f"Server error: {response.get('message', 'Unknown error')}")
@@ -56,8 +117,8 @@ class ModelClient:
         """Reset the server's session (clear buffers)."""
         request = {"type": "reset"}
         
-        self.socket.send(pickle.dumps(request))
-        response = pickle.loads(self.socket.recv())
+        self.socket.send_multipart(pack_message(request), copy=False)
+        response = unpack_message(self.socket.recv_multipart(copy=False))
         
         if response["status"] != "ok":
             raise RuntimeError(f"Server error: {response.get('message', 'Unknown error')}")
@@ -68,8 +129,8 @@ class ModelClient:
         """Get session info from the server."""
         request = {"type": "info"}
         
-        self.socket.send(pickle.dumps(request))
-        response = pickle.loads(self.socket.recv())
+        self.socket.send_multipart(pack_message(request), copy=False)
+        response = unpack_message(self.socket.recv_multipart(copy=False))
         
         if response["status"] != "ok":
             raise RuntimeError(f"Server error: {response.get('message', 'Unknown error')}")
@@ -119,6 +119,12 @@ class InferenceSession:
         self.obs_buffer = deque(maxlen=self.max_buffer_size)
         self.action_buffer = deque(maxlen=self.max_buffer_size)
 
+        # Frames are uploaded once, through a reused pinned staging tensor on
+        # this session's own stream, and kept on the GPU in obs_buffer.
+        self._host_staging = None
+        self._copy_stream = torch.cuda.Stream()
+        self._copy_done = torch.cuda.Event()
+
     @classmethod
     def from_ckpt(cls, checkpoint_path: str, old_layout=False, cfg_scale=1.0, context_length=None):
         """Create an InferenceSession from a checkpoint."""
@@ -179,7 +185,7 @@ class InferenceSession:
         start_time = time.time()
 
         current_frame = self.img_proc([obs], return_tensors="pt")["pixel_values"]
-        self.obs_buffer.append(current_frame)
+        self.obs_buffer.append(self._upload_frame(current_frame))
         
         # Prepare model inputs
         pixel_values = torch.cat(list(self.obs_buffer), dim=0)
@@ -213,11 +219,11 @@ class InferenceSession:
         inference_time = time.time() - start_time
         print(f"Inference time: {inference_time:.3f}s")
 
-        # Convert to list of action dicts
+        # Plain float32 arrays: they go over the wire as raw buffers, not per-float objects
         n_actions = len(predicted_actions["buttons"])
-        j_left = predicted_actions["j_left"].squeeze().cpu().numpy()
-        j_right = predicted_actions["j_right"].squeeze().cpu().numpy()
-        buttons = predicted_actions["buttons"].squeeze().cpu().numpy()
+        j_left = predicted_actions["j_left"].squeeze().float().cpu().numpy()
+        j_right = predicted_actions["j_right"].squeeze().float().cpu().numpy()
+        buttons = predicted_actions["buttons"].squeeze().float().cpu().numpy()
 
         return {
             "j_left": j_left,
@@ -225,6 +231,23 @@ class InferenceSession:
             "buttons": buttons,
         }
 
+    def _upload_frame(self, frame: torch.Tensor) -> torch.Tensor:
+        """Copy a preprocessed CPU frame to the GPU via pinned memory."""
+        staging = self._host_staging
+        if staging is None or staging.shape != frame.shape or staging.dtype != frame.dtype:
+            staging = self._host_staging = torch.empty(frame.shape, dtype=frame.dtype, pin_memory=True)
+        # The previous H2D copy may still be reading the staging buffer (e.g.
+        # if that predict() raised before synchronizing), so wait for it.
+        self._copy_done.synchronize()
+        staging.copy_(frame)
+        with torch.cuda.stream(self._copy_stream):
+            device_frame = staging.to("cuda", non_blocking=True)
+            self._copy_done.record()
+        current = torch.cuda.current_stream()
+        current.wait_stream(self._copy_stream)
+        device_frame.record_stream(current)
+        return device_frame
+
     def _predict_flowmatching(self, pixel_values, action_tensors):
 
         available_frames = len(self.obs_buffer)
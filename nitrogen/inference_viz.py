@@ -1,3 +1,5 @@
+from fractions import Fraction
+
 import numpy as np
 import cv2
 import av
@@ -9,6 +11,7 @@ def create_viz(
     j_right: np.ndarray,
     buttons: np.ndarray,
     token_set: list,
+    out: np.ndarray = None,
 ):
     """
     Visualize gamepad actions alongside a gameplay video frame.
@@ -20,6 +23,8 @@ def create_viz(
     - j_right: 16x2 array of right joystick positions (-1 to 1)
     - buttons: 16x17 array of button states (boolean)
     - token_set: List of button names
+    - out: Optional reused (height, width + panel, 3) buffer. `frame` may be
+      a view of its left region, in which case it is not copied.
     
     Returns:
     - Visualization as numpy array
@@ -33,10 +38,18 @@ def create_viz(
     combined_height = frame_height
     
     # Create combined image (frame + visualization)
-    combined = np.zeros((combined_height, combined_width, 3), dtype=np.uint8)
+    if out is None:
+        combined = np.zeros((combined_height, combined_width, 3), dtype=np.uint8)
+    else:
+        if out.shape != (combined_height, combined_width, 3):
+            raise ValueError(f"out has shape {out.shape}, expected {(combined_height, combined_width, 3)}")
+        combined = out
+        combined[:, frame_width:] = 0
     
     # Put the frame on the left side
-    combined[:frame_height, :frame_width] = frame
+    frame_roi = combined[:frame_height, :frame_width]
+    if not (frame.ctypes.data == frame_roi.ctypes.data and frame.strides == frame_roi.strides):
+        frame_roi[...] = frame
     
     # Starting position for visualizations
     viz_x = frame_width
@@ -191,8 +204,44 @@ def draw_button_grid(img, x, y, button_size, buttons, current_row, token_set):
                 cv2.putText(img, f"{col+1}. {token_set[col]}", (entry_x, entry_y), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
 
+# Encoder-specific quality/speed options; `crf` maps to each encoder's
+# constant-quality knob. Unlisted codecs get the libx264 options.
+def _encoder_options(codec, crf, preset):
+    if codec == "ffv1":
+        # Lossless, intra-only (every frame seekable), sliced for threading.
+        return {"level": "3", "g": "1", "slices": "4", "threads": "auto"}
+    if codec.endswith("_nvenc"):
+        return {"rc": "vbr", "cq": crf, "preset": "p1", "tune": "ll"}
+    if codec.endswith("_qsv"):
+        return {"global_quality": crf, "preset": "veryfast"}
+    if codec.endswith("_videotoolbox"):
+        return {"realtime": "1"}
+    return {"crf": crf, "preset": preset}
+
+
+def _encoder_pix_fmt(codec):
+    # ffv1 keeps full RGB; yuv420p would make it lossy.
+    return "gbrp" if codec == "ffv1" else "yuv420p"
+
+
+def _encoder_available(codec, width, height, fps, options):
+    """Open a throwaway encoder to check the codec works on this machine."""
+    try:
+        ctx = av.CodecContext.create(codec, "w")
+        ctx.width = width
+        ctx.height = height
+        ctx.pix_fmt = _encoder_pix_fmt(codec)
+        ctx.framerate = fps
+        ctx.time_base = Fraction(1, fps)
+        ctx.options = options
+        ctx.open()
+        return True
+    except Exception:
+        return False
+
+
 class VideoRecorder:
-    def __init__(self, output_file, fps=30, crf=28, preset="fast"):
+    def __init__(self, output_file, fps=30, crf=28, preset="fast", codec="h264"):
         """
         Initialize a video recorder using PyAV.
         
@@ -201,24 +250,31 @@ class VideoRecorder:
             fps (int): Frames per second
             crf (int): Constant Rate Factor (0-51, higher means smaller file but lower quality)
             preset (str): Encoding preset (ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow)
+            codec (str): Encoder name, e.g. h264 (libx264), ffv1 (lossless), h264_nvenc,
+                h264_qsv or h264_videotoolbox. Encoders that fail to open fall back to h264.
         """
         self.output_file = output_file
         self.fps = fps
         self.crf = str(crf)
         self.preset = preset
+        self.codec = codec
         self.container = av.open(output_file, mode="w")
         self.stream = None
         
     def init_stream(self, width, height):
         """Initialize the video stream with the frame dimensions."""
-        self.stream = self.container.add_stream("h264", rate=self.fps)
+        codec = self.codec
+        options = _encoder_options(codec, self.crf, self.preset)
+        if codec != "h264" and not _encoder_available(codec, width, height, self.fps, options):
+            print(f"Video encoder {codec} unavailable; falling back to h264.")
+            codec = "h264"
+            options = _encoder_options(codec, self.crf, self.preset)
+        self.codec = codec
+        self.stream = self.container.add_stream(codec, rate=self.fps)
         self.stream.width = width
         self.stream.height = height
-        self.stream.pix_fmt = "yuv420p"
-        self.stream.options = {
-            "crf": self.crf,
-            "preset": self.preset
-        }
+        self.stream.pix_fmt = _encoder_pix_fmt(codec)
+        self.stream.options = options
         
     def add_frame(self, frame):
         """
@@ -230,7 +286,9 @@ class VideoRecorder:
         if self.stream is None:
             self.init_stream(frame.shape[1], frame.shape[0])
             
-        av_frame = av.VideoFrame.from_ndarray(np.array(frame), format="rgb24")
+        # from_ndarray copies into the frame planes; only non-contiguous
+        # inputs need a staging copy first.
+        av_frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(frame), format="rgb24")
         for packet in self.stream.encode(av_frame):
             self.container.mux(packet)
         
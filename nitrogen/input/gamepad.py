@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import math
 import platform
 from typing import Any, Mapping
 
+import numpy as np
+
 from nitrogen.input.base import InputController
 
 try:
@@ -61,7 +64,34 @@ PS4_MAPPING = {
 }
 
 
-def _value_from_action(value: Any) -> int:
+_BUTTON_CONTROLS = (
+    "EAST",
+    "SOUTH",
+    "NORTH",
+    "WEST",
+    "BACK",
+    "GUIDE",
+    "START",
+    "DPAD_DOWN",
+    "DPAD_LEFT",
+    "DPAD_RIGHT",
+    "DPAD_UP",
+    "LEFT_SHOULDER",
+    "RIGHT_SHOULDER",
+    "LEFT_THUMB",
+    "RIGHT_THUMB",
+)
+
+# (up - down, right - left) for each d-pad control.
+_DPAD_OFFSETS = {
+    "DPAD_UP": (1, 0),
+    "DPAD_DOWN": (-1, 0),
+    "DPAD_LEFT": (0, -1),
+    "DPAD_RIGHT": (0, 1),
+}
+
+
+def _value_from_action_slow(value: Any) -> int:
     if value is None:
         return 0
     if hasattr(value, "__len__") and not isinstance(value, (str, bytes)):
@@ -75,6 +105,52 @@ def _value_from_action(value: Any) -> int:
         return 0
 
 
+def _finite_to_int(value: Any) -> int:
+    return int(value) if math.isfinite(value) else 0
+
+
+def _ndarray0(value: np.ndarray) -> int:
+    try:
+        if value.ndim == 0:
+            return int(value.item())
+        return int(value[0]) if len(value) else 0
+    except (TypeError, ValueError):
+        # NaN/inf, nested or non-numeric contents: same result as the generic path.
+        return _value_from_action_slow(value)
+
+
+def _sequence0(value: Any) -> int:
+    try:
+        return int(value[0]) if value else 0
+    except (TypeError, ValueError):
+        return _value_from_action_slow(value)
+
+
+# Exact-type fast paths; anything else (subclasses, numpy scalars of other
+# dtypes, strings) goes through the generic conversion.
+_DISPATCH = {
+    int: int,
+    float: _finite_to_int,
+    bool: int,
+    np.ndarray: _ndarray0,
+    list: _sequence0,
+    tuple: _sequence0,
+    type(None): lambda value: 0,
+    np.int16: int,
+    np.uint8: int,
+    np.int64: int,
+    np.float32: _finite_to_int,
+    np.float64: _finite_to_int,
+}
+
+
+def _value_from_action(value: Any) -> int:
+    fn = _DISPATCH.get(type(value))
+    if fn is not None:
+        return fn(value)
+    return _value_from_action_slow(value)
+
+
 class GamepadController(InputController):
     def __init__(self, controller_type: str = "xbox", system: str | None = None, dry_run: bool = False) -> None:
         super().__init__(dry_run=dry_run)
@@ -96,76 +172,131 @@ class GamepadController(InputController):
         else:
             raise ValueError("Unsupported controller type")
 
-        self.left_joystick_x = 0
-        self.left_joystick_y = 0
-        self.right_joystick_x = 0
-        self.right_joystick_y = 0
+        # Resolve the vgamepad button constants once instead of a getattr per press.
+        button_enum = vg.XUSB_BUTTON if controller_type == "xbox" else vg.DS4_BUTTONS
+        self._button_ids = {}
+        for control, name in self.mapping.items():
+            if name.startswith(("XUSB_", "DS4_BUTTON")) and hasattr(button_enum, name):
+                self._button_ids[control] = int(getattr(button_enum, name))
+        self._press = self.gamepad.press_button
+        self._release = self.gamepad.release_button
+
+        # The DS4 d-pad is not a set of button bits but a hat direction in
+        # the low nibble of wButtons: map (up - down, right - left) to it.
+        self._dpad_directions = None
+        self._dpad_none = None
+        if controller_type == "ps4":
+            d = vg.DS4_DPAD_DIRECTIONS
+            self._dpad_none = d.DS4_BUTTON_DPAD_NONE
+            self._dpad_directions = {
+                (0, 0): d.DS4_BUTTON_DPAD_NONE,
+                (1, 0): d.DS4_BUTTON_DPAD_NORTH,
+                (1, 1): d.DS4_BUTTON_DPAD_NORTHEAST,
+                (0, 1): d.DS4_BUTTON_DPAD_EAST,
+                (-1, 1): d.DS4_BUTTON_DPAD_SOUTHEAST,
+                (-1, 0): d.DS4_BUTTON_DPAD_SOUTH,
+                (-1, -1): d.DS4_BUTTON_DPAD_SOUTHWEST,
+                (0, -1): d.DS4_BUTTON_DPAD_WEST,
+                (1, -1): d.DS4_BUTTON_DPAD_NORTHWEST,
+            }
+        # Controls written as wButtons bits; anything unmappable is skipped.
+        self._bit_controls = tuple(
+            (control, self._button_ids[control]) for control in _BUTTON_CONTROLS if control in self._button_ids
+        )
+
+        # (button bitmask, left trigger, right trigger, left stick, right stick,
+        # DS4 d-pad direction) as of the last report sent; None forces a full
+        # reset on the next step.
+        self._last_report = None
 
     def step(self, action: Mapping[str, Any]) -> None:
         if self.dry_run:
             return
 
-        self.gamepad.reset()
+        buttons = 0
+        for control, bit in self._bit_controls:
+            if action.get(control):
+                buttons |= bit
+
+        dpad = None
+        if self._dpad_directions is not None:
+            vertical = bool(action.get("DPAD_UP")) - bool(action.get("DPAD_DOWN"))
+            horizontal = bool(action.get("DPAD_RIGHT")) - bool(action.get("DPAD_LEFT"))
+            dpad = self._dpad_directions[(vertical, horizontal)]
+
+        left_trigger = _value_from_action(action.get("LEFT_TRIGGER"))
+        right_trigger = _value_from_action(action.get("RIGHT_TRIGGER"))
+
+        left_stick = None
+        lx = action.get("AXIS_LEFTX")
+        ly = action.get("AXIS_LEFTY")
+        if lx is not None and ly is not None:
+            left_stick = (_value_from_action(lx), _value_from_action(ly))
+
+        right_stick = None
+        rx = action.get("AXIS_RIGHTX")
+        ry = action.get("AXIS_RIGHTY")
+        if rx is not None and ry is not None:
+            right_stick = (_value_from_action(rx), _value_from_action(ry))
 
-        for control in [
-            "EAST",
-            "SOUTH",
-            "NORTH",
-            "WEST",
-            "BACK",
-            "GUIDE",
-            "START",
-            "DPAD_DOWN",
-            "DPAD_LEFT",
-            "DPAD_RIGHT",
-            "DPAD_UP",
-            "LEFT_SHOULDER",
-            "RIGHT_SHOULDER",
-            "LEFT_THUMB",
-            "RIGHT_THUMB",
-        ]:
-            if control in action:
-                if bool(action[control]):
-                    self.press_button(control)
-                else:
-                    self.release_button(control)
-
-        if "LEFT_TRIGGER" in action:
-            self.set_trigger("LEFT_TRIGGER", _value_from_action(action["LEFT_TRIGGER"]))
-        if "RIGHT_TRIGGER" in action:
-            self.set_trigger("RIGHT_TRIGGER", _value_from_action(action["RIGHT_TRIGGER"]))
-
-        if "AXIS_LEFTX" in action and "AXIS_LEFTY" in action:
-            self.set_joystick("AXIS_LEFTX", _value_from_action(action["AXIS_LEFTX"]))
-            self.set_joystick("AXIS_LEFTY", _value_from_action(action["AXIS_LEFTY"]))
-
-        if "AXIS_RIGHTX" in action and "AXIS_RIGHTY" in action:
-            self.set_joystick("AXIS_RIGHTX", _value_from_action(action["AXIS_RIGHTX"]))
-            self.set_joystick("AXIS_RIGHTY", _value_from_action(action["AXIS_RIGHTY"]))
+        report = (buttons, left_trigger, right_trigger, left_stick, right_stick, dpad)
+        last = self._last_report
+        if report == last:
+            return
+        if last is None:
+            self.gamepad.reset()
+            last = (0, 0, 0, None, None, self._dpad_none)
+
+        # Write all changed button bits (the Xbox d-pad included) into the
+        # report in one assignment. Only the changed bits are touched, so the
+        # DS4 d-pad direction nibble is left to directional_pad(). The report
+        # object is fetched each time because reset() replaces it.
+        changed = buttons ^ last[0]
+        if changed:
+            gamepad_report = self.gamepad.report
+            gamepad_report.wButtons = (gamepad_report.wButtons & ~changed) | (buttons & changed)
+
+        if left_trigger != last[1]:
+            self.set_trigger("LEFT_TRIGGER", left_trigger)
+        if right_trigger != last[2]:
+            self.set_trigger("RIGHT_TRIGGER", right_trigger)
+        if left_stick != last[3]:
+            if left_stick is None:
+                self.gamepad.left_joystick(x_value=0, y_value=0)
+            else:
+                self.set_joystick("LEFT_JOYSTICK", *left_stick)
+        if right_stick != last[4]:
+            if right_stick is None:
+                self.gamepad.right_joystick(x_value=0, y_value=0)
+            else:
+                self.set_joystick("RIGHT_JOYSTICK", *right_stick)
+        if dpad != last[5]:
+            self.gamepad.directional_pad(direction=dpad)
 
         self.gamepad.update()
+        self._last_report = report
 
     def press_button(self, button: str) -> None:
         if self.dry_run:
             return
-        button_mapped = self.mapping.get(button)
-        if self.controller_type == "xbox":
-            self.gamepad.press_button(button=getattr(vg.XUSB_BUTTON, button_mapped))
-        elif self.controller_type == "ps4":
-            self.gamepad.press_button(button=getattr(vg.DS4_BUTTONS, button_mapped))
-        else:
-            raise ValueError("Unsupported controller type")
+        self._last_report = None
+        if self._dpad_directions is not None and button in _DPAD_OFFSETS:
+            self.gamepad.directional_pad(direction=self._dpad_directions[_DPAD_OFFSETS[button]])
+            return
+        button_id = self._button_ids.get(button)
+        if button_id is not None:
+            self._press(button=button_id)
 
     def release_button(self, button: str) -> None:
         if self.dry_run:
             return
-        button_mapped = self.mapping.get(button)
-        if self.controller_type == "xbox":
-            self.gamepad.release_button(button=getattr(vg.XUSB_BUTTON, button_mapped))
-        elif self.controller_type == "ps4":
-            self.gamepad.release_button(button=getattr(vg.DS4_BUTTONS, button_mapped))
-        else:
-            raise ValueError("Unsupported controller type")
+        self._last_report = None
+        if self._dpad_directions is not None and button in _DPAD_OFFSETS:
+            self.gamepad.directional_pad(direction=self._dpad_none)
+            return
+        button_id = self._button_ids.get(button)
+        if button_id is not None:
+            self._release(button=button_id)
 
     def set_trigger(self, trigger: str, value: int) -> None:
         if self.dry_run:
@@ -178,31 +309,22 @@ class GamepadController(InputController):
         else:
             raise ValueError("Unsupported trigger action")
 
-    def set_joystick(self, joystick: str, value: int) -> None:
+    def set_joystick(self, joystick: str, x_value: int, y_value: int) -> None:
         if self.dry_run:
             return
-        if joystick == "AXIS_LEFTX":
-            self.left_joystick_x = value
-            self.gamepad.left_joystick(x_value=self.left_joystick_x, y_value=self.left_joystick_y)
-        elif joystick == "AXIS_LEFTY":
-            if self.system == "windows":
-                value = -value - 1
-            self.left_joystick_y = value
-            self.gamepad.left_joystick(x_value=self.left_joystick_x, y_value=self.left_joystick_y)
-        elif joystick == "AXIS_RIGHTX":
-            self.right_joystick_x = value
-            self.gamepad.right_joystick(x_value=self.right_joystick_x, y_value=self.right_joystick_y)
-        elif joystick == "AXIS_RIGHTY":
-            if self.system == "windows":
-                value = -value - 1
-            self.right_joystick_y = value
-            self.gamepad.right_joystick(x_value=self.right_joystick_x, y_value=self.right_joystick_y)
+        if self.system == "windows":
+            y_value = -y_value - 1
+        if joystick == "LEFT_JOYSTICK":
+            self.gamepad.left_joystick(x_value=x_value, y_value=y_value)
+        elif joystick == "RIGHT_JOYSTICK":
+            self.gamepad.right_joystick(x_value=x_value, y_value=y_value)
         else:
             raise ValueError("Unsupported joystick action")
 
     def wakeup(self, duration: float = 0.1) -> None:
         if self.dry_run:
             return
+        self._last_report = None
         self.gamepad.press_button(vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_THUMB)
         self.gamepad.update()
         import time
@@ -214,5 +336,6 @@ class GamepadController(InputController):
     def reset(self) -> None:
         if self.dry_run:
             return
+        self._last_report = None
         self.gamepad.reset()
         self.gamepad.update()
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import math
+import queue
+import threading
 from typing import Any, Mapping, Set
 
+import numpy as np
+
 from nitrogen.input.base import InputController
 from nitrogen.input.keymap import (
     EXTENDED_KEYS,
@@ -28,7 +33,24 @@ except Exception:  # pragma: no cover - optional fallback
 
 
 
+def _finite_to_int(value: Any) -> int:
+    return int(value) if math.isfinite(value) else 0
+
+
+# Exact-type fast paths for the scalars actions actually carry.
+_SCALAR_TO_INT = {
+    int: int,
+    bool: int,
+    float: _finite_to_int,
+    **{t: int for t in (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64, np.bool_)},
+    **{t: _finite_to_int for t in (np.float16, np.float32, np.float64)},
+}
+
+
 def _value_from_action(value: Any) -> int:
+    convert = _SCALAR_TO_INT.get(type(value))
+    if convert is not None:
+        return convert(value)
     if value is None:
         return 0
     if hasattr(value, "__len__") and not isinstance(value, (str, bytes)):
@@ -79,18 +101,101 @@ if _SENDINPUT_AVAILABLE:
     INPUT_KEYBOARD = 1
     KEYEVENTF_KEYUP = 0x0002
     KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_SCANCODE = 0x0008
+    MAPVK_VK_TO_VSC = 0
     MOUSEEVENTF_MOVE = 0x0001
     MOUSEEVENTF_WHEEL = 0x0800
 
+    # SendInput copies the events out, so one buffer serves every call.
+    _INPUT_BUF = (INPUT * 64)()
+    _INPUT_SIZE = ctypes.sizeof(INPUT)
+
+    # Bound once with a declared prototype so each call skips the attribute
+    # lookup and ctypes' argument type inference.
+    _SendInput = _user32.SendInput
+    _SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+    _SendInput.restype = wintypes.UINT
+
+    _MapVirtualKeyW = _user32.MapVirtualKeyW
+    _MapVirtualKeyW.argtypes = (wintypes.UINT, wintypes.UINT)
+    _MapVirtualKeyW.restype = wintypes.UINT
+
+
+# Fixed bit per known key / mouse button, so pressed state and per-step diffs
+# are plain ints instead of sets.
+KEY_NAMES = tuple(VK_CODE)
+KEY_BITS = {key: 1 << i for i, key in enumerate(KEY_NAMES)}
+MOUSE_BUTTON_NAMES = tuple(MOUSE_BUTTON_FLAGS)
+MOUSE_BUTTON_BITS = {button: 1 << i for i, button in enumerate(MOUSE_BUTTON_NAMES)}
+
+# Keymap names that pyautogui spells differently.
+_PYAUTOGUI_KEY_NAMES = {
+    "lshift": "shiftleft",
+    "rshift": "shiftright",
+    "lctrl": "ctrlleft",
+    "rctrl": "ctrlright",
+    "lalt": "altleft",
+    "ralt": "altright",
+}
+
 
-def _send_input(*inputs: "INPUT") -> None:
-    if not _SENDINPUT_AVAILABLE:
-        return
-    n_inputs = len(inputs)
-    if n_inputs == 0:
-        return
-    array = (INPUT * n_inputs)(*inputs)
-    _user32.SendInput(n_inputs, array, ctypes.sizeof(INPUT))
+def _mask_to_names(mask: int, names: tuple[str, ...]) -> Set[str]:
+    selected = set()
+    while mask:
+        bit = mask & -mask
+        selected.add(names[bit.bit_length() - 1])
+        mask ^= bit
+    return selected
+
+
+_short_send_warned = False
+
+
+def _input_buffer(n_inputs: int) -> "ctypes.Array[INPUT]":
+    """The shared INPUT array, grown to hold at least `n_inputs` events."""
+    global _INPUT_BUF
+    if n_inputs > len(_INPUT_BUF):
+        _INPUT_BUF = (INPUT * n_inputs)()
+    return _INPUT_BUF
+
+
+def _send_input(buf: "ctypes.Array[INPUT]", n_inputs: int) -> int:
+    """Inject the first `n_inputs` events of `buf` with one SendInput call; returns how many were inserted."""
+    global _short_send_warned
+    if not _SENDINPUT_AVAILABLE or n_inputs == 0:
+        return 0
+    sent = _SendInput(n_inputs, buf, _INPUT_SIZE)
+    if sent != n_inputs and not _short_send_warned:
+        _short_send_warned = True
+        print(
+            f"Warning: SendInput inserted {sent} of {n_inputs} events "
+            f"(error {ctypes.get_last_error()}). Input may be blocked by UIPI; "
+            "if the game runs elevated, run this process as administrator too."
+        )
+    return sent
+
+
+class _InputSender:
+    """Worker thread that issues SendInput batches in submission order."""
+
+    def __init__(self) -> None:
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="sendinput", daemon=True)
+        self._thread.start()
+
+    def submit(self, buf: "ctypes.Array[INPUT]", n_inputs: int) -> None:
+        self._queue.put((buf, n_inputs))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            _send_input(*batch)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=1.0)
 
 
 class KeyboardMouseController(InputController):
@@ -100,17 +205,24 @@ class KeyboardMouseController(InputController):
         backend: str = "sendinput",
         key_list: list[str] | None = None,
         mouse_buttons: list[str] | None = None,
+        async_input: bool = False,
     ) -> None:
         super().__init__(dry_run=dry_run)
         self.backend = backend
-        self.pressed_keys: Set[str] = set()
-        self.pressed_mouse_buttons: Set[str] = set()
+        self._key_mask = 0
+        self._button_mask = 0
         self.key_list = [normalize_key(k) for k in key_list] if key_list else None
         if self.key_list:
             self.key_list = [k for k in self.key_list if k in VK_CODE]
         self.mouse_button_list = [normalize_mouse_button(b) for b in mouse_buttons] if mouse_buttons else None
         if self.mouse_button_list:
             self.mouse_button_list = [b for b in self.mouse_button_list if b in MOUSE_BUTTON_FLAGS]
+        self._key_list_bits = [KEY_BITS[k] for k in self.key_list] if self.key_list else []
+        self._button_list_bits = (
+            [MOUSE_BUTTON_BITS[b] for b in self.mouse_button_list] if self.mouse_button_list else []
+        )
+        self._key_extractors: dict[type, Any] = {}
+        self._button_extractors: dict[type, Any] = {}
 
         if self.backend == "sendinput" and not _SENDINPUT_AVAILABLE:
             self.backend = "pyautogui"
@@ -118,142 +230,301 @@ class KeyboardMouseController(InputController):
         if self.backend == "pyautogui" and pyautogui is None:
             raise ImportError("pyautogui is required for the keyboard/mouse fallback backend.")
 
+        self._sender: _InputSender | None = None
+        if self.backend == "sendinput":
+            self._build_input_templates()
+            if async_input and not dry_run:
+                self._sender = _InputSender()
+        elif self.backend == "pyautogui":
+            self._bind_pyautogui()
+
+    @property
+    def pressed_keys(self) -> Set[str]:
+        return _mask_to_names(self._key_mask, KEY_NAMES)
+
+    @property
+    def pressed_mouse_buttons(self) -> Set[str]:
+        return _mask_to_names(self._button_mask, MOUSE_BUTTON_NAMES)
+
+    def _build_input_templates(self) -> None:
+        # Key and button events carry fixed data, so build every INPUT once,
+        # indexed by bit position; move/wheel templates are copied into the
+        # batch array and get their payload set there.
+        # Keys are sent as hardware scan codes: games reading raw input or
+        # DirectInput only see those, and Windows still derives the VK for
+        # everything else. Keys without a scan code keep the VK form.
+        self._key_down: list[INPUT] = []
+        self._key_up: list[INPUT] = []
+        for key in KEY_NAMES:
+            vk = VK_CODE[key]
+            flags = KEYEVENTF_EXTENDEDKEY if key in EXTENDED_KEYS else 0
+            scan = _MapVirtualKeyW(vk, MAPVK_VK_TO_VSC)
+            if scan:
+                vk = 0
+                flags |= KEYEVENTF_SCANCODE
+            self._key_down.append(INPUT(
+                type=INPUT_KEYBOARD,
+                ki=KEYBDINPUT(wVk=vk, wScan=scan, dwFlags=flags, time=0, dwExtraInfo=0),
+            ))
+            self._key_up.append(INPUT(
+                type=INPUT_KEYBOARD,
+                ki=KEYBDINPUT(wVk=vk, wScan=scan, dwFlags=flags | KEYEVENTF_KEYUP, time=0, dwExtraInfo=0),
+            ))
+        self._mbtn_down: list[INPUT] = []
+        self._mbtn_up: list[INPUT] = []
+        for button in MOUSE_BUTTON_NAMES:
+            down_flag, up_flag, data = MOUSE_BUTTON_FLAGS[button]
+            self._mbtn_down.append(INPUT(
+                type=INPUT_MOUSE,
+                mi=MOUSEINPUT(dx=0, dy=0, mouseData=data, dwFlags=down_flag, time=0, dwExtraInfo=0),
+            ))
+            self._mbtn_up.append(INPUT(
+                type=INPUT_MOUSE,
+                mi=MOUSEINPUT(dx=0, dy=0, mouseData=data, dwFlags=up_flag, time=0, dwExtraInfo=0),
+            ))
+        self._move_input = INPUT(
+            type=INPUT_MOUSE,
+            mi=MOUSEINPUT(dx=0, dy=0, mouseData=0, dwFlags=MOUSEEVENTF_MOVE, time=0, dwExtraInfo=0),
+        )
+        self._wheel_input = INPUT(
+            type=INPUT_MOUSE,
+            mi=MOUSEINPUT(dx=0, dy=0, mouseData=0, dwFlags=MOUSEEVENTF_WHEEL, time=0, dwExtraInfo=0),
+        )
+
+    def _bind_pyautogui(self) -> None:
+        # pyautogui.keyDown/keyUp re-run their checks and sleep PAUSE after
+        # every call. Resolve the platform key functions once and run the
+        # fail-safe check once per step instead (FAILSAFE stays enabled).
+        pyautogui.PAUSE = 0
+        platform = getattr(pyautogui, "platformModule", None)
+        self._pag_key_down = getattr(platform, "_keyDown", None) or pyautogui.keyDown
+        self._pag_key_up = getattr(platform, "_keyUp", None) or pyautogui.keyUp
+        self._pag_keys = [_PYAUTOGUI_KEY_NAMES.get(key, key) for key in KEY_NAMES]
+
     def step(self, action: Mapping[str, Any]) -> None:
-        desired_keys = self._extract_keys(action.get("keys", []))
-        desired_buttons = self._extract_buttons(action.get("mouse_buttons", []))
+        key_mask = self._extract_keys(action.get("keys", []))
+        button_mask = self._extract_buttons(action.get("mouse_buttons", []))
         dx = _value_from_action(action.get("mouse_dx", 0))
         dy = _value_from_action(action.get("mouse_dy", 0))
         wheel = _value_from_action(action.get("mouse_wheel", 0))
 
-        keys_to_release = self.pressed_keys - desired_keys
-        keys_to_press = desired_keys - self.pressed_keys
-        buttons_to_release = self.pressed_mouse_buttons - desired_buttons
-        buttons_to_press = desired_buttons - self.pressed_mouse_buttons
+        # Steady state (same keys held, no motion): nothing to send.
+        if key_mask == self._key_mask and button_mask == self._button_mask and not (dx or dy or wheel):
+            return
 
         if not self.dry_run:
-            for key in keys_to_release:
-                self._key_event(key, is_down=False)
-            for key in keys_to_press:
-                self._key_event(key, is_down=True)
-            for button in buttons_to_release:
-                self._mouse_button_event(button, is_down=False)
-            for button in buttons_to_press:
-                self._mouse_button_event(button, is_down=True)
-            if dx != 0 or dy != 0:
-                self._mouse_move(dx, dy)
-            if wheel != 0:
-                self._mouse_wheel(wheel)
-
-        self.pressed_keys = desired_keys
-        self.pressed_mouse_buttons = desired_buttons
+            key_up = self._key_mask & ~key_mask
+            key_down = key_mask & ~self._key_mask
+            button_up = self._button_mask & ~button_mask
+            button_down = button_mask & ~self._button_mask
+            if self.backend == "pyautogui":
+                pyautogui.failSafeCheck()
+                self._key_events(key_up, is_down=False)
+                self._key_events(key_down, is_down=True)
+                self._mouse_button_events(button_up, is_down=False)
+                self._mouse_button_events(button_down, is_down=True)
+                if dx != 0 or dy != 0:
+                    self._mouse_move(dx, dy)
+                if wheel != 0:
+                    self._mouse_wheel(wheel)
+            else:
+                self._inject(key_up, key_down, button_up, button_down, dx, dy, wheel)
+
+        self._key_mask = key_mask
+        self._button_mask = button_mask
 
     def reset(self) -> None:
         if not self.dry_run:
-            for key in list(self.pressed_keys):
-                self._key_event(key, is_down=False)
-            for button in list(self.pressed_mouse_buttons):
-                self._mouse_button_event(button, is_down=False)
-        self.pressed_keys.clear()
-        self.pressed_mouse_buttons.clear()
-
-    def _extract_keys(self, raw: Any) -> Set[str]:
-        if isinstance(raw, Mapping):
-            keys = {k for k, v in raw.items() if v}
-        elif isinstance(raw, (list, tuple, set)):
-            keys = set(raw)
+            if self.backend == "pyautogui":
+                self._key_events(self._key_mask, is_down=False)
+                self._mouse_button_events(self._button_mask, is_down=False)
+            else:
+                self._inject(self._key_mask, 0, self._button_mask, 0)
+        self._key_mask = 0
+        self._button_mask = 0
+
+    def close(self) -> None:
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+
+    def _new_batch(self, n_inputs: int) -> "ctypes.Array[INPUT]":
+        # Queued batches are read later by the worker, so each needs its own array.
+        if self._sender is not None:
+            return (INPUT * n_inputs)()
+        return _input_buffer(n_inputs)
+
+    def _flush(self, buf: "ctypes.Array[INPUT]", n_inputs: int) -> None:
+        if self._sender is not None:
+            self._sender.submit(buf, n_inputs)
         else:
-            keys = set()
-        if self.key_list and not isinstance(raw, Mapping):
-            vector_keys = self._vector_to_names(raw, self.key_list)
-            if vector_keys is not None:
-                return vector_keys
-        normalized = set()
-        for key in keys:
-            if not isinstance(key, str):
+            _send_input(buf, n_inputs)
+
+    def _inject(
+        self,
+        key_up: int,
+        key_down: int,
+        button_up: int,
+        button_down: int,
+        dx: int = 0,
+        dy: int = 0,
+        wheel: int = 0,
+    ) -> None:
+        # All events of a step are written straight into one INPUT array and
+        # injected with one SendInput call, which also keeps them from
+        # interleaving with real input.
+        n_inputs = (
+            key_up.bit_count()
+            + key_down.bit_count()
+            + button_up.bit_count()
+            + button_down.bit_count()
+            + (dx != 0 or dy != 0)
+            + (wheel != 0)
+        )
+        if n_inputs == 0:
+            return
+        buf = self._new_batch(n_inputs)
+        i = self._write_events(buf, 0, key_up, self._key_up)
+        i = self._write_events(buf, i, key_down, self._key_down)
+        i = self._write_events(buf, i, button_up, self._mbtn_up)
+        i = self._write_events(buf, i, button_down, self._mbtn_down)
+        if dx != 0 or dy != 0:
+            buf[i] = self._move_input
+            mi = buf[i].mi
+            mi.dx = dx
+            mi.dy = dy
+            i += 1
+        if wheel != 0:
+            buf[i] = self._wheel_input
+            buf[i].mi.mouseData = wheel
+        self._flush(buf, n_inputs)
+
+    @staticmethod
+    def _write_events(buf: "ctypes.Array[INPUT]", i: int, mask: int, templates: list["INPUT"]) -> int:
+        while mask:
+            bit = mask & -mask
+            buf[i] = templates[bit.bit_length() - 1]
+            i += 1
+            mask ^= bit
+        return i
+
+    def _extract_keys(self, raw: Any) -> int:
+        extract = self._key_extractors.get(type(raw))
+        if extract is None:
+            extract = self._key_extractors[type(raw)] = self._make_extractor(
+                type(raw), self._key_list_bits, KEY_BITS, normalize_key
+            )
+        return extract(raw)
+
+    def _extract_buttons(self, raw: Any) -> int:
+        extract = self._button_extractors.get(type(raw))
+        if extract is None:
+            extract = self._button_extractors[type(raw)] = self._make_extractor(
+                type(raw), self._button_list_bits, MOUSE_BUTTON_BITS, normalize_mouse_button
+            )
+        return extract(raw)
+
+    @classmethod
+    def _make_extractor(cls, tp: type, list_bits: list[int], bits: Mapping[str, int], normalize):
+        """Build the raw -> bitmask extractor for one container type.
+
+        Callers send the same container type every step, so the type checks
+        are resolved once here and cached per type by the caller.
+        """
+        names_to_mask = cls._names_to_mask
+        mapping_to_mask = cls._mapping_to_mask
+        vector_to_mask = cls._vector_to_mask
+
+        def general(raw: Any) -> int:
+            if list_bits:
+                vector_mask = vector_to_mask(raw, list_bits)
+                if vector_mask is not None:
+                    return vector_mask
+            if isinstance(raw, (list, tuple, set)):
+                return names_to_mask(raw, bits, normalize)
+            return 0
+
+        if issubclass(tp, np.ndarray):
+            if not list_bits:
+                return general
+            shape = (len(list_bits),)
+
+            def from_array(raw: np.ndarray) -> int:
+                if raw.shape != shape:
+                    return general(raw)
+                mask = 0
+                for i in np.flatnonzero(raw > 0).tolist():
+                    mask |= list_bits[i]
+                return mask
+
+            return from_array
+        if issubclass(tp, Mapping):
+            return lambda raw: mapping_to_mask(raw, bits, normalize)
+        if issubclass(tp, (list, tuple, set)) and not list_bits:
+            return lambda raw: names_to_mask(raw, bits, normalize)
+        return general
+
+    @staticmethod
+    def _mapping_to_mask(raw: Mapping[Any, Any], bits: Mapping[str, int], normalize) -> int:
+        mask = 0
+        for name, value in raw.items():
+            if not value or not isinstance(name, str):
                 continue
-            name = normalize_key(key)
-            if name in VK_CODE:
-                normalized.add(name)
-        return normalized
-
-    def _extract_buttons(self, raw: Any) -> Set[str]:
-        if isinstance(raw, Mapping):
-            buttons = {k for k, v in raw.items() if v}
-        elif isinstance(raw, (list, tuple, set)):
-            buttons = set(raw)
-        else:
-            buttons = set()
-        if self.mouse_button_list and not isinstance(raw, Mapping):
-            vector_buttons = self._vector_to_names(raw, self.mouse_button_list)
-            if vector_buttons is not None:
-                return vector_buttons
-        normalized = set()
-        for button in buttons:
-            if not isinstance(button, str):
+            bit = bits.get(normalize(name))
+            if bit is not None:
+                mask |= bit
+        return mask
+
+    @staticmethod
+    def _names_to_mask(raw: Any, bits: Mapping[str, int], normalize) -> int:
+        mask = 0
+        for name in raw:
+            if not isinstance(name, str):
                 continue
-            name = normalize_mouse_button(button)
-            if name in MOUSE_BUTTON_FLAGS:
-                normalized.add(name)
-        return normalized
+            bit = bits.get(normalize(name))
+            if bit is not None:
+                mask |= bit
+        return mask
 
     @staticmethod
-    def _vector_to_names(raw: Any, names: list[str]) -> Set[str] | None:
+    def _vector_to_mask(raw: Any, bits: list[int]) -> int | None:
         if not hasattr(raw, "__len__"):
             return None
         try:
-            if len(raw) != len(names):
+            if len(raw) != len(bits):
                 return None
-            selected = set()
-            for name, value in zip(names, raw):
+            mask = 0
+            for bit, value in zip(bits, raw):
                 if float(value) > 0:
-                    selected.add(name)
-            return selected
+                    mask |= bit
+            return mask
         except Exception:
             return None
 
-    def _key_event(self, key: str, is_down: bool) -> None:
-        if self.backend == "pyautogui":
-            if is_down:
-                pyautogui.keyDown(key)
-            else:
-                pyautogui.keyUp(key)
-            return
+    def _key_events(self, mask: int, is_down: bool) -> None:
+        # pyautogui backend only; SendInput batches go through _inject.
+        send = self._pag_key_down if is_down else self._pag_key_up
+        names = self._pag_keys
+        while mask:
+            bit = mask & -mask
+            send(names[bit.bit_length() - 1])
+            mask ^= bit
 
-        vk = VK_CODE.get(key)
-        if vk is None:
-            return
-        flags = 0
-        if not is_down:
-            flags |= KEYEVENTF_KEYUP
-        if key in EXTENDED_KEYS:
-            flags |= KEYEVENTF_EXTENDEDKEY
-        ki = KEYBDINPUT(wVk=vk, wScan=0, dwFlags=flags, time=0, dwExtraInfo=0)
-        _send_input(INPUT(type=INPUT_KEYBOARD, ki=ki))
+    def _mouse_button_events(self, mask: int, is_down: bool) -> None:
+        for button in _mask_to_names(mask, MOUSE_BUTTON_NAMES):
+            self._mouse_button_event(button, is_down)
 
+    # pyautogui backend only, like _key_events.
     def _mouse_move(self, dx: int, dy: int) -> None:
-        if self.backend == "pyautogui":
-            pyautogui.moveRel(dx, dy, duration=0)
-            return
-        mi = MOUSEINPUT(dx=dx, dy=dy, mouseData=0, dwFlags=MOUSEEVENTF_MOVE, time=0, dwExtraInfo=0)
-        _send_input(INPUT(type=INPUT_MOUSE, mi=mi))
+        pyautogui.moveRel(dx, dy, duration=0)
 
     def _mouse_button_event(self, button: str, is_down: bool) -> None:
-        if self.backend == "pyautogui":
-            if button not in {"left", "right", "middle"}:
-                return
-            if is_down:
-                pyautogui.mouseDown(button=button)
-            else:
-                pyautogui.mouseUp(button=button)
+        if button not in {"left", "right", "middle"}:
             return
-        down_flag, up_flag, data = MOUSE_BUTTON_FLAGS[button]
-        flag = down_flag if is_down else up_flag
-        mi = MOUSEINPUT(dx=0, dy=0, mouseData=data, dwFlags=flag, time=0, dwExtraInfo=0)
-        _send_input(INPUT(type=INPUT_MOUSE, mi=mi))
+        if is_down:
+            pyautogui.mouseDown(button=button)
+        else:
+            pyautogui.mouseUp(button=button)
 
     def _mouse_wheel(self, amount: int) -> None:
-        if self.backend == "pyautogui":
-            pyautogui.scroll(amount)
-            return
-        mi = MOUSEINPUT(dx=0, dy=0, mouseData=amount, dwFlags=MOUSEEVENTF_WHEEL, time=0, dwExtraInfo=0)
-        _send_input(INPUT(type=INPUT_MOUSE, mi=mi))
+        pyautogui.scroll(amount)
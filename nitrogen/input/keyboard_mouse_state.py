@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import platform
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from nitrogen.input.keymap import (
     MOUSE_BUTTON_VK,
@@ -16,12 +19,61 @@ assert platform.system().lower() == "windows", "This module is only supported on
 import win32api
 
 
+class KeyPoller:
+    """
+    Daemon thread that polls GetAsyncKeyState for a fixed list of virtual
+    keys. `read()` reports every key that was down at any poll since the
+    previous read, so taps shorter than a capture frame are not lost.
+    """
+
+    def __init__(self, vks: Sequence[int], interval: float = 0.001) -> None:
+        self._vks = tuple(vks)
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._down = np.zeros(len(self._vks), dtype=np.uint8)
+        self._seen = np.zeros(len(self._vks), dtype=np.uint8)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._poll()
+        self._thread = threading.Thread(target=self._run, name="key-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def read(self) -> np.ndarray:
+        """Keys down since the last read; keys still held stay set."""
+        with self._lock:
+            state = self._seen.copy()
+            self._seen[:] = self._down
+        return state
+
+    def _poll(self) -> None:
+        get_key_state = win32api.GetAsyncKeyState
+        down = [1 if get_key_state(vk) & 0x8000 else 0 for vk in self._vks]
+        with self._lock:
+            self._down[:] = down
+            self._seen |= self._down
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._poll()
+
+
 class KeyboardMouseState:
     def __init__(
         self,
         keys: List[str],
         mouse_buttons: List[str],
         raw_mouse: Optional[object] = None,
+        key_poll_interval: Optional[float] = None,
     ) -> None:
         self.keys = []
         for key in keys:
@@ -35,25 +87,69 @@ class KeyboardMouseState:
                 self.mouse_buttons.append(norm)
         self._prev_pos = None
         self._raw_mouse = raw_mouse
+        # Optional background polling of keys + mouse buttons (see KeyPoller).
+        self._key_poller: Optional[KeyPoller] = None
+        if key_poll_interval:
+            vks = [VK_CODE[key] for key in self.keys] + [MOUSE_BUTTON_VK[b] for b in self.mouse_buttons]
+            self._key_poller = KeyPoller(vks, interval=key_poll_interval)
+            self._key_poller.start()
+
+    def close(self) -> None:
+        if self._key_poller is not None:
+            self._key_poller.stop()
+            self._key_poller = None
 
     def sample(self) -> Dict[str, object]:
-        keys_vec = []
-        pressed_keys = []
-        for key in self.keys:
-            vk = VK_CODE[key]
-            pressed = bool(win32api.GetAsyncKeyState(vk) & 0x8000)
-            keys_vec.append(1 if pressed else 0)
-            if pressed:
-                pressed_keys.append(key)
-
-        buttons_vec = []
-        pressed_buttons = []
-        for button in self.mouse_buttons:
-            vk = MOUSE_BUTTON_VK[button]
-            pressed = bool(win32api.GetAsyncKeyState(vk) & 0x8000)
-            buttons_vec.append(1 if pressed else 0)
-            if pressed:
-                pressed_buttons.append(button)
+        return self.sample_into({})
+
+    def sample_into(self, out: Dict[str, object]) -> Dict[str, object]:
+        """
+        Fill `out` with the current state and return it. A dict passed in
+        again is updated in place, reusing its lists, so it must be consumed
+        (e.g. serialized) before the next call.
+        """
+        if "keys" not in out:
+            # First use: create the entries in record order.
+            out.update(
+                timestamp=0.0,
+                keys=[],
+                keys_vec=[],
+                mouse_buttons=[],
+                mouse_buttons_vec=[],
+                mouse_dx=0,
+                mouse_dy=0,
+                mouse_wheel=0,
+                mouse_pos=[0, 0],
+            )
+        pressed_keys = out["keys"]
+        keys_vec = out["keys_vec"]
+        pressed_buttons = out["mouse_buttons"]
+        buttons_vec = out["mouse_buttons_vec"]
+        pressed_keys.clear()
+        keys_vec.clear()
+        pressed_buttons.clear()
+        buttons_vec.clear()
+
+        if self._key_poller is not None:
+            state = self._key_poller.read().tolist()
+            n_keys = len(self.keys)
+            keys_vec.extend(state[:n_keys])
+            buttons_vec.extend(state[n_keys:])
+            pressed_keys.extend(key for key, pressed in zip(self.keys, keys_vec) if pressed)
+            pressed_buttons.extend(b for b, pressed in zip(self.mouse_buttons, buttons_vec) if pressed)
+        else:
+            get_key_state = win32api.GetAsyncKeyState
+            for key in self.keys:
+                pressed = bool(get_key_state(VK_CODE[key]) & 0x8000)
+                keys_vec.append(1 if pressed else 0)
+                if pressed:
+                    pressed_keys.append(key)
+
+            for button in self.mouse_buttons:
+                pressed = bool(get_key_state(MOUSE_BUTTON_VK[button]) & 0x8000)
+                buttons_vec.append(1 if pressed else 0)
+                if pressed:
+                    pressed_buttons.append(button)
 
         x, y = win32api.GetCursorPos()
 
@@ -65,17 +161,14 @@ class KeyboardMouseState:
         else:
             dx, dy, wheel = self._cursor_delta(x, y)
 
-        return {
-            "timestamp": time.time(),
-            "keys": pressed_keys,
-            "keys_vec": keys_vec,
-            "mouse_buttons": pressed_buttons,
-            "mouse_buttons_vec": buttons_vec,
-            "mouse_dx": int(dx),
-            "mouse_dy": int(dy),
-            "mouse_wheel": int(wheel),
-            "mouse_pos": [int(x), int(y)],
-        }
+        out["timestamp"] = time.time()
+        out["mouse_dx"] = int(dx)
+        out["mouse_dy"] = int(dy)
+        out["mouse_wheel"] = int(wheel)
+        mouse_pos = out["mouse_pos"]
+        mouse_pos[0] = int(x)
+        mouse_pos[1] = int(y)
+        return out
 
     def _cursor_delta(self, x: int, y: int) -> Tuple[int, int, int]:
         if self._prev_pos is None:
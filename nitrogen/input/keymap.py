@@ -147,23 +147,32 @@ DEFAULT_KM_KEYS = [
 
 
 def normalize_key(name: str) -> str:
+    # Canonical names need no strip/lower copies.
+    if name in VK_CODE:
+        return name
     key = name.strip().lower()
     return KEY_ALIASES.get(key, key)
 
 
+_MOUSE_BUTTON_ALIASES = {
+    "mouse1": "left",
+    "button1": "left",
+    "mouse2": "right",
+    "button2": "right",
+    "mouse3": "middle",
+    "button3": "middle",
+    "mouse4": "x1",
+    "button4": "x1",
+    "mouse5": "x2",
+    "button5": "x2",
+}
+
+
 def normalize_mouse_button(name: str) -> str:
+    if name in MOUSE_BUTTON_FLAGS:
+        return name
     button = name.strip().lower()
-    if button in {"mouse1", "button1"}:
-        return "left"
-    if button in {"mouse2", "button2"}:
-        return "right"
-    if button in {"mouse3", "button3"}:
-        return "middle"
-    if button in {"mouse4", "button4"}:
-        return "x1"
-    if button in {"mouse5", "button5"}:
-        return "x2"
-    return button
+    return _MOUSE_BUTTON_ALIASES.get(button, button)
 
 
 def parse_key_list(raw: str | None, default: Iterable[str]) -> List[str]:
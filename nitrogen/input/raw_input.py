@@ -24,6 +24,25 @@ HWND_MESSAGE = wintypes.HWND(-3)
 _user32 = ctypes.WinDLL("user32", use_last_error=True)
 _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
 
+_GetRawInputBuffer = _user32.GetRawInputBuffer
+_GetRawInputBuffer.argtypes = (ctypes.c_void_p, ctypes.POINTER(wintypes.UINT), wintypes.UINT)
+_GetRawInputBuffer.restype = wintypes.UINT
+
+# NEXTRAWINPUTBLOCK: records in a GetRawInputBuffer batch are pointer-size aligned.
+_RAWINPUT_ALIGN = ctypes.sizeof(ctypes.c_void_p)
+_RAW_BUFFER_BYTES = 64 * 1024
+
+
+def _is_wow64() -> bool:
+    # 32-bit processes on 64-bit Windows get 64-bit headers in batches;
+    # those use the one-message-at-a-time path instead.
+    flag = wintypes.BOOL(False)
+    try:
+        _kernel32.IsWow64Process(_kernel32.GetCurrentProcess(), ctypes.byref(flag))
+    except AttributeError:
+        return False
+    return bool(flag.value)
+
 
 WNDPROC = ctypes.WINFUNCTYPE(
     wintypes.LRESULT,
@@ -107,10 +126,15 @@ class RawMouseHook:
         capture_background: bool = True,
         require_focus: bool = False,
         focus_pid: int | None = None,
+        use_input_buffer: bool = True,
     ) -> None:
         self.capture_background = capture_background
         self.require_focus = require_focus
         self.focus_pid = focus_pid
+        # Drain queued raw input with one GetRawInputBuffer call per WM_INPUT
+        # instead of one message per report (matters for 1-8 kHz mice).
+        self.use_input_buffer = use_input_buffer and not _is_wow64()
+        self._raw_buf = None
         self._lock = threading.Lock()
         self._dx = 0
         self._dy = 0
@@ -226,16 +250,24 @@ class RawMouseHook:
         return _user32.DefWindowProcW(hwnd, msg, wparam, lparam)
 
     def _handle_raw_input(self, h_raw_input) -> None:
+        focused = True
         if self.require_focus:
             focused = self._is_focused()
             if not focused:
                 self._focused_last = False
                 self._last_abs = None
-                return
-            if not self._focused_last:
+            elif not self._focused_last:
                 self._last_abs = None
-            self._focused_last = True
+                self._focused_last = True
+
+        if focused:
+            self._read_raw_input(h_raw_input)
+        if self.use_input_buffer:
+            # Reports queued behind this message; consumed (and dropped
+            # while unfocused) so they don't arrive as stale WM_INPUTs.
+            self._drain_raw_input_buffer(accumulate=focused)
 
+    def _read_raw_input(self, h_raw_input) -> None:
         size = wintypes.UINT(0)
         if _user32.GetRawInputData(
             h_raw_input,
@@ -259,7 +291,33 @@ class RawMouseHook:
         if read_size != size.value:
             return
 
-        raw = ctypes.cast(buf, ctypes.POINTER(RAWINPUT)).contents
+        self._accumulate(ctypes.cast(buf, ctypes.POINTER(RAWINPUT)).contents)
+
+    def _drain_raw_input_buffer(self, accumulate: bool) -> None:
+        if self._raw_buf is None:
+            # uint64 elements keep the batch 8-byte aligned.
+            self._raw_buf = (ctypes.c_uint64 * (_RAW_BUFFER_BYTES // 8))()
+        buf = self._raw_buf
+        base = ctypes.addressof(buf)
+        header_size = ctypes.sizeof(RAWINPUTHEADER)
+        while True:
+            size = wintypes.UINT(ctypes.sizeof(buf))
+            count = _GetRawInputBuffer(buf, ctypes.byref(size), header_size)
+            if count == 0xFFFFFFFF:
+                # Not supported here: fall back to per-message reads.
+                self.use_input_buffer = False
+                return
+            if count == 0:
+                return
+            if not accumulate:
+                continue
+            offset = 0
+            for _ in range(count):
+                raw = RAWINPUT.from_address(base + offset)
+                self._accumulate(raw)
+                offset = (offset + raw.header.dwSize + _RAWINPUT_ALIGN - 1) & ~(_RAWINPUT_ALIGN - 1)
+
+    def _accumulate(self, raw: RAWINPUT) -> None:
         if raw.header.dwType != RIM_TYPEMOUSE:
             return
 
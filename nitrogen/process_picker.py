@@ -1,49 +1,54 @@
 from __future__ import annotations
 
+import ctypes
 import os
+import re
 import sys
+import time
+from ctypes import wintypes
+from bisect import bisect_right
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 import psutil
 
-import win32gui
-import win32process
 
+_NAME_STRIP_CHARS = "\"' \t\r\n"
 
+
+@lru_cache(maxsize=1024)
 def _normalize_process_name(value: str) -> str:
-    name = value.strip().strip('"').strip("'")
-    if "\\" in name or "/" in name:
-        name = os.path.basename(name)
-    return name
+    name = value.strip(_NAME_STRIP_CHARS)
+    sep = max(name.rfind("\\"), name.rfind("/"))
+    return name if sep < 0 else name[sep + 1:]
 
 
-def _name_variants(name: str) -> set[str]:
+@lru_cache(maxsize=512)
+def _name_variants(name: str) -> frozenset[str]:
     base = _normalize_process_name(name).lower()
-    variants = {base}
     if base.endswith(".exe"):
-        variants.add(base[:-4])
-    else:
-        variants.add(base + ".exe")
-    return variants
+        return frozenset((base, base[:-4]))
+    return frozenset((base, base + ".exe"))
 
 
 def _process_name_matches(query: str, candidate: str) -> bool:
-    return bool(_name_variants(query) & _name_variants(candidate))
+    return not _name_variants(query).isdisjoint(_name_variants(candidate))
 
 
 def process_name_matches(query: str, candidate: str) -> bool:
     return _process_name_matches(query, candidate)
 
 
+_PID_SPEC_RE = re.compile(r"\s*(?:pid:\s*)?(\d+)\s*", re.IGNORECASE)
+
+
 def parse_process_spec(value: str) -> Tuple[int | None, str]:
+    m = _PID_SPEC_RE.fullmatch(value)
+    if m is not None:
+        return int(m[1]), value.strip()
     raw = value.strip()
-    if raw.lower().startswith("pid:"):
-        try:
-            return int(raw.split(":", 1)[1].strip()), raw
-        except Exception:
-            return None, raw
-    if raw.isdigit():
-        return int(raw), raw
+    if raw[:4].lower() == "pid:":
+        return None, raw
     return None, _normalize_process_name(raw)
 
 
@@ -66,75 +71,149 @@ def process_has_window(value: str) -> bool:
     windows = _collect_windows()
     if pid is not None:
         return pid in windows
+    names = _pid_name_snapshot()
     for pid in windows.keys():
-        try:
-            proc_name = psutil.Process(pid).name()
-        except Exception:
-            continue
+        proc_name = names.get(pid)
         if proc_name and _process_name_matches(name, proc_name):
             return True
     return False
 
 
+# (timestamp, {pid: name}) of the last process snapshot.
+_PID_NAME_CACHE: tuple[float, Dict[int, str | None]] | None = None
+
+
+def _pid_name_snapshot(ttl: float = 0.25) -> Dict[int, str | None]:
+    """pid -> process name from one process_iter pass, reused for `ttl` seconds."""
+    global _PID_NAME_CACHE
+    now = time.monotonic()
+    cached = _PID_NAME_CACHE
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    names: Dict[int, str | None] = {}
+    for proc in psutil.process_iter(["pid", "name"]):
+        try:
+            names[int(proc.info["pid"])] = proc.info.get("name")
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    _PID_NAME_CACHE = (now, names)
+    return names
+
+
+_WNDENUMPROC = (
+    ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    if hasattr(ctypes, "WINFUNCTYPE")
+    else None
+)
+
+
+@lru_cache(maxsize=1)
+def _get_user32() -> ctypes.WinDLL:
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    user32.EnumWindows.argtypes = (_WNDENUMPROC, wintypes.LPARAM)
+    user32.EnumWindows.restype = wintypes.BOOL
+    user32.IsWindowVisible.argtypes = (wintypes.HWND,)
+    user32.IsWindowVisible.restype = wintypes.BOOL
+    user32.GetWindowThreadProcessId.argtypes = (wintypes.HWND, ctypes.POINTER(wintypes.DWORD))
+    user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+    user32.GetWindowTextW.argtypes = (wintypes.HWND, wintypes.LPWSTR, ctypes.c_int)
+    user32.GetWindowTextW.restype = ctypes.c_int
+    return user32
+
+
 def _collect_windows() -> Dict[int, List[str]]:
     windows: Dict[int, List[str]] = {}
+    try:
+        user32 = _get_user32()
+    except Exception:
+        return windows
+
+    # The callback only records handles; the per-window queries run below
+    # as plain argtyped calls instead of inside the callback trampoline.
+    hwnds: List[int] = []
 
     def enum_window_callback(hwnd, _):
-        if not win32gui.IsWindowVisible(hwnd):
-            return True
-        title = win32gui.GetWindowText(hwnd)
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        if pid:
-            if not title:
-                title = "<untitled>"
-            titles = windows.setdefault(pid, [])
-            if title not in titles:
-                titles.append(title)
+        hwnds.append(hwnd)
         return True
 
     try:
-        win32gui.EnumWindows(enum_window_callback, None)
+        user32.EnumWindows(_WNDENUMPROC(enum_window_callback), 0)
     except Exception:
-        pass
+        return windows
+
+    is_visible = user32.IsWindowVisible
+    get_pid = user32.GetWindowThreadProcessId
+    get_text = user32.GetWindowTextW
+    pid = wintypes.DWORD()
+    pid_ref = ctypes.byref(pid)
+    buf = ctypes.create_unicode_buffer(512)
+    for hwnd in hwnds:
+        if not is_visible(hwnd):
+            continue
+        get_pid(hwnd, pid_ref)
+        if not pid.value:
+            continue
+        title = buf.value if get_text(hwnd, buf, len(buf)) else "<untitled>"
+        titles = windows.setdefault(pid.value, [])
+        if title not in titles:
+            titles.append(title)
     return windows
 
+
 def list_processes(show_all: bool = False) -> List[Dict[str, object]]:
     windows = _collect_windows()
     processes: List[Dict[str, object]] = []
 
+    names = _pid_name_snapshot()
+
     if show_all:
-        seen = set()
-        for proc in psutil.process_iter(["pid", "name"]):
-            try:
-                pid = int(proc.info["pid"])
-                name = proc.info.get("name") or f"pid_{pid}"
-                titles = windows.get(pid, [])
-                processes.append({"pid": pid, "name": name, "titles": titles})
-                seen.add(pid)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        for pid, name in names.items():
+            titles = windows.get(pid, [])
+            processes.append({"pid": pid, "name": name or f"pid_{pid}", "titles": titles})
         for pid, titles in windows.items():
-            if pid in seen:
+            if pid in names:
                 continue
             processes.append({"pid": pid, "name": f"pid_{pid}", "titles": titles})
     else:
         for pid, titles in windows.items():
-            try:
-                name = psutil.Process(pid).name()
-            except Exception:
-                name = f"pid_{pid}"
+            name = names.get(pid) or f"pid_{pid}"
             processes.append({"pid": pid, "name": name, "titles": titles})
 
+    # Lowercased copies for the live filter, which re-runs on every keystroke.
+    for proc in processes:
+        proc["_name_lc"] = str(proc["name"]).lower()
+        proc["_titles_lc"] = [str(t).lower() for t in proc["titles"]]
+
     processes.sort(
         key=lambda p: (
             0 if p.get("titles") else 1,
-            str(p["name"]).lower(),
+            p["_name_lc"],
             int(p["pid"]),
         )
     )
     return processes
 
 
+# (timestamp, show_all, processes) of the last list_processes() call.
+_PROC_CACHE: tuple[float, bool, List[Dict[str, object]]] | None = None
+
+
+def list_processes_cached(
+    show_all: bool = False,
+    ttl: float = 0.25,
+    refresh: bool = False,
+) -> List[Dict[str, object]]:
+    """list_processes(), reused for `ttl` seconds unless `refresh` is set."""
+    global _PROC_CACHE
+    now = time.monotonic()
+    cached = _PROC_CACHE
+    if not refresh and cached is not None and cached[1] == show_all and now - cached[0] < ttl:
+        return cached[2]
+    processes = list_processes(show_all=show_all)
+    _PROC_CACHE = (now, show_all, processes)
+    return processes
+
+
 def list_visible_processes() -> List[Dict[str, object]]:
     return list_processes(show_all=False)
 
@@ -146,23 +225,62 @@ def _compact_titles(titles: List[str], max_len: int = 80) -> str:
     return joined[: max_len - 3] + "..."
 
 
+# (process list, haystack, segment starts, name variant -> indices) for the
+# last list searched; holding the list keeps the identity check valid.
+_SEARCH_INDEX: tuple[List[Dict[str, object]], str, List[int], Dict[str, List[int]]] | None = None
+
+
+def _search_index(
+    processes: List[Dict[str, object]],
+) -> tuple[str, List[int], Dict[str, List[int]]]:
+    global _SEARCH_INDEX
+    cached = _SEARCH_INDEX
+    if cached is not None and cached[0] is processes:
+        return cached[1], cached[2], cached[3]
+    parts: List[str] = []
+    starts: List[int] = []
+    by_variant: Dict[str, List[int]] = {}
+    offset = 0
+    for idx, proc in enumerate(processes):
+        name_lc = proc.get("_name_lc")
+        if name_lc is None:
+            name_lc = str(proc.get("name", "")).lower()
+        titles_lc = proc.get("_titles_lc")
+        if titles_lc is None:
+            titles_lc = [str(t).lower() for t in proc.get("titles", [])]
+        # NUL separators: typed queries are printable, so a hit never spans
+        # two fields or two processes.
+        segment = "\0".join([name_lc, *titles_lc]) + "\0"
+        starts.append(offset)
+        parts.append(segment)
+        offset += len(segment)
+        for variant in _name_variants(name_lc):
+            by_variant.setdefault(variant, []).append(idx)
+    haystack = "".join(parts)
+    _SEARCH_INDEX = (processes, haystack, starts, by_variant)
+    return haystack, starts, by_variant
+
+
 def _match_processes(processes: List[Dict[str, object]], query: str) -> List[Dict[str, object]]:
     q = _normalize_process_name(query).lower()
     if not q:
         return processes
-    matches: List[Dict[str, object]] = []
-    for proc in processes:
-        name = str(proc.get("name", ""))
-        if _process_name_matches(q, name):
-            matches.append(proc)
-            continue
-        if q and q in name.lower():
-            matches.append(proc)
-            continue
-        titles = [str(t) for t in proc.get("titles", [])]
-        if any(q in t.lower() for t in titles):
-            matches.append(proc)
-    return matches
+    haystack, starts, by_variant = _search_index(processes)
+    hit = bytearray(len(processes))
+    for variant in _name_variants(q):
+        for idx in by_variant.get(variant, ()):
+            hit[idx] = 1
+    # One C-level scan of every name and title; after a hit, jump to the
+    # next process since one hit per process is enough.
+    n = len(starts)
+    pos = haystack.find(q)
+    while pos >= 0:
+        idx = bisect_right(starts, pos) - 1
+        hit[idx] = 1
+        if idx + 1 >= n:
+            break
+        pos = haystack.find(q, starts[idx + 1])
+    return [proc for proc, flag in zip(processes, hit) if flag]
 
 
 def _describe_list_mode(show_all: bool) -> str:
@@ -195,7 +313,31 @@ def _supports_live_search() -> bool:
         return False
 
 
+_VT_MODE: bool | None = None
+
+
+def _enable_vt_mode() -> bool:
+    """Turn on ANSI escape handling for the console once; False if unavailable."""
+    global _VT_MODE
+    if _VT_MODE is None:
+        _VT_MODE = False
+        try:
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+            mode = wintypes.DWORD()
+            if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+                _VT_MODE = bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+        except Exception:
+            _VT_MODE = False
+    return _VT_MODE
+
+
 def _clear_screen() -> None:
+    if _enable_vt_mode():
+        sys.stdout.write("\x1b[H\x1b[2J")
+        sys.stdout.flush()
+        return
     try:
         os.system("cls")
     except Exception:
@@ -372,10 +514,19 @@ def _choose_process_name_live(
     filter_text = ""
     buffer = ""
     message = ""
+    refresh = True
+    default_ok = False
+    default_ok_ts = float("-inf")
 
     while True:
-        default_ok = process_has_window(default_name) if default_name else False
-        processes = list_processes(show_all=show_all)
+        # Typing only re-filters; the window walk is redone on F5/Tab or
+        # once the short cache expires, and the default's window probe at
+        # most once a second.
+        processes = list_processes_cached(show_all=show_all, refresh=refresh)
+        if default_name and (refresh or time.monotonic() - default_ok_ts >= 1.0):
+            default_ok = process_has_window(default_name)
+            default_ok_ts = time.monotonic()
+        refresh = False
         filter_text = _derive_filter_text(buffer, filter_text)
         visible = _match_processes(processes, filter_text)
         total_visible = len(visible)
@@ -437,10 +588,12 @@ def _choose_process_name_live(
             continue
         if ch == "\t":
             show_all = not show_all
+            refresh = True
             continue
         if ch in ("\x00", "\xe0"):
             key = msvcrt.getwch()
             if key == "?":
+                refresh = True
                 continue
             continue
         if ch.isprintable():
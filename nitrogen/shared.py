@@ -1,10 +1,12 @@
 from pathlib import Path
 
-BUTTON_ACTION_TOKENS = [
+# Tuple: the order defines the model's button columns and must stay fixed.
+BUTTON_ACTION_TOKENS = (
     'BACK', 'DPAD_DOWN', 'DPAD_LEFT', 'DPAD_RIGHT', 'DPAD_UP', 'EAST', 'GUIDE', 
     'LEFT_SHOULDER', 'LEFT_THUMB', 'LEFT_TRIGGER', 'NORTH', 'RIGHT_BOTTOM', 'RIGHT_LEFT', 
     'RIGHT_RIGHT', 'RIGHT_SHOULDER', 'RIGHT_THUMB', 'RIGHT_TRIGGER', 'RIGHT_UP', 'SOUTH', 
     'START', 'WEST'
-]
+)
+BUTTON_ACTION_TOKENS_SET = frozenset(BUTTON_ACTION_TOKENS)
 
 PATH_REPO = Path(__file__).parent.parent.resolve()
\ No newline at end of file
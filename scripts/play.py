@@ -5,8 +5,8 @@ Key improvements vs original:
 - Clean `main()` entrypoint and structured functions
 - Optional .env support (python-dotenv) without hard dependency
 - ENV defaults for process/port and other knobs
-- Correct, explicit dtypes for gamepad actions (int16 for axes, uint8 for triggers)
-- Safe action template copying (no shared numpy references)
+- Gamepad actions as plain ints in controller ranges (int16 axes, uint8 triggers)
+- Safe action template copying (no shared references)
 - JSONL logging without mutating in-memory actions
 - Optional PNG debug saving with interval (prevents disk explosion)
 - Deduplicated “menu init” flow for special games
@@ -18,17 +18,24 @@ from __future__ import annotations
 import os
 import time
 import json
+import queue
+import threading
 import argparse
 from pathlib import Path
-from collections import OrderedDict
-from typing import Any, Dict, Iterable, Tuple
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Tuple
 
 import cv2
 import numpy as np
 from PIL import Image
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
 from nitrogen.game_env import GameEnv
-from nitrogen.action_adapters.gamepad_to_km import gamepad_action_to_km
+from nitrogen.action_adapters.gamepad_to_km import gamepad_action_to_km, km_action_names
 from nitrogen.process_picker import choose_process_name, process_exists, process_has_window
 from nitrogen.shared import BUTTON_ACTION_TOKENS, PATH_REPO
 from nitrogen.inference_viz import create_viz, VideoRecorder
@@ -57,16 +64,57 @@ def env_flag(name: str, default: bool = False) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+def watch_stop_file(stop_file: Path, interval: float = 0.25) -> threading.Event:
+    """
+    Return an event that gets set once `stop_file` exists. The file is
+    polled from a daemon thread so the play loop never stats it itself.
+    """
+    stop_event = threading.Event()
+
+    def poll() -> None:
+        while not stop_file.exists():
+            if stop_event.wait(interval):
+                return
+        stop_event.set()
+
+    threading.Thread(target=poll, name="stop-file", daemon=True).start()
+    return stop_event
+
+
 # -----------------------------
 # Image pre-processing
 # -----------------------------
-def preprocess_img(main_image: Image.Image) -> Image.Image:
+_preprocess_buf = np.empty((256, 256, 3), dtype=np.uint8)
+
+
+def preprocess_img(main_image: Image.Image | np.ndarray) -> np.ndarray:
     """
-    Convert PIL->OpenCV, resize to 256x256, return PIL RGB.
+    Resize an RGB frame to 256x256 (resize is channel-order agnostic).
+
+    The result is a module buffer that the next call overwrites. Large
+    captures are first halved with pyrDown until the short side is below
+    512, so the final INTER_AREA pass averages far fewer source pixels.
+    """
+    arr = np.asarray(main_image)
+    if arr.shape == _preprocess_buf.shape:
+        return arr
+    while min(arr.shape[0], arr.shape[1]) >= 512:
+        arr = cv2.pyrDown(arr)
+    return cv2.resize(arr, (256, 256), dst=_preprocess_buf, interpolation=cv2.INTER_AREA)
+
+
+def resize_frame(frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Resize `frame` to `dst`'s size, writing into `dst`. Frames already at
+    that size are returned as-is; INTER_AREA is only used for downscaling,
+    upscaling uses the cheaper INTER_LINEAR.
     """
-    main_cv = cv2.cvtColor(np.array(main_image), cv2.COLOR_RGB2BGR)
-    final_image = cv2.resize(main_cv, (256, 256), interpolation=cv2.INTER_AREA)
-    return Image.fromarray(cv2.cvtColor(final_image, cv2.COLOR_BGR2RGB))
+    height, width = dst.shape[:2]
+    if frame.shape[0] == height and frame.shape[1] == width:
+        return frame
+    upscale = frame.shape[0] < height or frame.shape[1] < width
+    interpolation = cv2.INTER_LINEAR if upscale else cv2.INTER_AREA
+    return cv2.resize(frame, (width, height), dst=dst, interpolation=interpolation)
 
 
 # -----------------------------
@@ -75,66 +123,73 @@ def preprocess_img(main_image: Image.Image) -> Image.Image:
 AXIS_SCALE = 32767
 TRIGGER_SCALE = 255
 
-AXIS_DTYPE = np.int16
-TRIGGER_DTYPE = np.uint8
 
-
-def action_template() -> "OrderedDict[str, Any]":
+# Prototype for action_template(); every value is a plain int, so a shallow
+# copy is a complete, independent action. Plain dicts keep insertion order.
+_ACTION_TEMPLATE: Dict[str, int] = {
+    "WEST": 0,
+    "SOUTH": 0,
+    "BACK": 0,
+    "DPAD_DOWN": 0,
+    "DPAD_LEFT": 0,
+    "DPAD_RIGHT": 0,
+    "DPAD_UP": 0,
+    "GUIDE": 0,
+    "AXIS_LEFTX": 0,
+    "AXIS_LEFTY": 0,
+    "LEFT_SHOULDER": 0,
+    "LEFT_TRIGGER": 0,
+    "AXIS_RIGHTX": 0,
+    "AXIS_RIGHTY": 0,
+    "LEFT_THUMB": 0,
+    "RIGHT_THUMB": 0,
+    "RIGHT_SHOULDER": 0,
+    "RIGHT_TRIGGER": 0,
+    "START": 0,
+    "EAST": 0,
+    "NORTH": 0,
+}
+
+
+def action_template() -> Dict[str, Any]:
     """
     Create a fresh action template for each action step.
-    Use explicit dtypes to match typical controller expectations:
-      - axes: int16 in range [-32768..32767]
-      - triggers: uint8 in range [0..255]
+    Values are plain ints in the ranges controllers expect:
+      - axes: [-32768..32767] (int16)
+      - triggers: [0..255] (uint8)
     """
-    return OrderedDict(
-        [
-            ("WEST", 0),
-            ("SOUTH", 0),
-            ("BACK", 0),
-            ("DPAD_DOWN", 0),
-            ("DPAD_LEFT", 0),
-            ("DPAD_RIGHT", 0),
-            ("DPAD_UP", 0),
-            ("GUIDE", 0),
-            ("AXIS_LEFTX", np.array([0], dtype=AXIS_DTYPE)),
-            ("AXIS_LEFTY", np.array([0], dtype=AXIS_DTYPE)),
-            ("LEFT_SHOULDER", 0),
-            ("LEFT_TRIGGER", np.array([0], dtype=TRIGGER_DTYPE)),
-            ("AXIS_RIGHTX", np.array([0], dtype=AXIS_DTYPE)),
-            ("AXIS_RIGHTY", np.array([0], dtype=AXIS_DTYPE)),
-            ("LEFT_THUMB", 0),
-            ("RIGHT_THUMB", 0),
-            ("RIGHT_SHOULDER", 0),
-            ("RIGHT_TRIGGER", np.array([0], dtype=TRIGGER_DTYPE)),
-            ("START", 0),
-            ("EAST", 0),
-            ("NORTH", 0),
-        ]
-    )
+    return _ACTION_TEMPLATE.copy()
 
 
-def clamp01(x: float) -> float:
-    if x < 0.0:
-        return 0.0
-    if x > 1.0:
-        return 1.0
-    return x
+def km_action_template() -> Dict[str, Any]:
+    return {
+        "keys": [],
+        "mouse_dx": 0,
+        "mouse_dy": 0,
+        "mouse_buttons": [],
+        "mouse_wheel": 0,
+    }
 
 
-def clamp_axis(x: float) -> int:
-    # The model likely returns [-1..1]. Clip aggressively.
-    if x < -1.0:
-        x = -1.0
-    if x > 1.0:
-        x = 1.0
-    return int(x * AXIS_SCALE)
+@lru_cache(maxsize=8)
+def _token_layout(tokens: Tuple[str, ...]) -> Tuple[Tuple[str, ...], np.ndarray, np.ndarray]:
+    """
+    Column layout for a token set: output key order (axes, triggers,
+    buttons) plus the trigger and button column indices. The token set is
+    a constant, so this is computed once.
+    """
+    trigger_idx = np.array([j for j, name in enumerate(tokens) if "TRIGGER" in name], dtype=np.intp)
+    button_idx = np.array([j for j, name in enumerate(tokens) if "TRIGGER" not in name], dtype=np.intp)
+    names = ("AXIS_LEFTX", "AXIS_LEFTY", "AXIS_RIGHTX", "AXIS_RIGHTY")
+    names += tuple(tokens[j] for j in trigger_idx) + tuple(tokens[j] for j in button_idx)
+    return names, trigger_idx, button_idx
 
 
 def build_env_actions(
     pred: Dict[str, Any],
     token_set: Iterable[str],
     button_press_thres: float,
-) -> list["OrderedDict[str, Any]"]:
+) -> list[Dict[str, Any]]:
     """
     Convert model prediction into a list of gamepad actions.
     Expected pred keys: "j_left", "j_right", "buttons"
@@ -153,38 +208,53 @@ def build_env_actions(
     if n != len(j_left) or n != len(j_right):
         raise ValueError("Mismatch in action lengths: buttons vs j_left vs j_right")
 
-    token_list = list(token_set)
-
-    actions: list[OrderedDict[str, Any]] = []
-
-    for i in range(n):
-        a = action_template()
-
-        xl, yl = j_left[i]
-        xr, yr = j_right[i]
-
-        a["AXIS_LEFTX"] = np.array([clamp_axis(float(xl))], dtype=AXIS_DTYPE)
-        a["AXIS_LEFTY"] = np.array([clamp_axis(float(yl))], dtype=AXIS_DTYPE)
-        a["AXIS_RIGHTX"] = np.array([clamp_axis(float(xr))], dtype=AXIS_DTYPE)
-        a["AXIS_RIGHTY"] = np.array([clamp_axis(float(yr))], dtype=AXIS_DTYPE)
-
-        button_vector = buttons[i]
-        if len(button_vector) != len(token_list):
-            raise ValueError("Button vector length does not match token set length")
-
-        for name, value in zip(token_list, button_vector):
-            v = float(value)
-            if "TRIGGER" in name:
-                a[name] = np.array([int(clamp01(v) * TRIGGER_SCALE)], dtype=TRIGGER_DTYPE)
-            else:
-                a[name] = 1 if v > button_press_thres else 0
+    tokens = token_set if isinstance(token_set, tuple) else tuple(token_set)
+    names, trigger_idx, button_idx = _token_layout(tokens)
+    if n == 0:
+        return []
 
+    try:
+        button_values = np.asarray(buttons, dtype=np.float64)
+    except ValueError:
+        raise ValueError("Button vector length does not match token set length") from None
+    if button_values.shape != (n, len(tokens)):
+        raise ValueError("Button vector length does not match token set length")
+
+    # The model likely returns [-1..1]; clip aggressively. The whole plan is
+    # clipped and scaled in place, then truncated straight into one int row
+    # per action in `names` order (the same values the int16/uint8 casts give).
+    n_triggers = len(trigger_idx)
+    axes = np.empty((n, 4), dtype=np.float64)
+    axes[:, 0:2] = j_left
+    axes[:, 2:4] = j_right
+    # NaN -> 0 and inf -> a finite bound first: clip passes NaN through and
+    # the unsafe int cast below would turn it into INT32_MIN.
+    np.nan_to_num(axes, copy=False)
+    np.clip(axes, -1.0, 1.0, out=axes)
+    np.multiply(axes, AXIS_SCALE, out=axes)
+
+    triggers = button_values[:, trigger_idx]
+    np.nan_to_num(triggers, copy=False)
+    np.clip(triggers, 0.0, 1.0, out=triggers)
+    np.multiply(triggers, TRIGGER_SCALE, out=triggers)
+
+    out = np.empty((n, len(names)), dtype=np.int32)
+    np.copyto(out[:, :4], axes, casting="unsafe")
+    np.copyto(out[:, 4 : 4 + n_triggers], triggers, casting="unsafe")
+    np.greater(button_values[:, button_idx], button_press_thres, out=out[:, 4 + n_triggers :], casting="unsafe")
+    # tolist() yields Python ints.
+    rows = out.tolist()
+
+    actions: list[Dict[str, Any]] = []
+    for row in rows:
+        a = _ACTION_TEMPLATE.copy()
+        a.update(zip(names, row))
         actions.append(a)
 
     return actions
 
 
-def sanitize_menu_actions(a: "OrderedDict[str, Any]") -> None:
+def sanitize_menu_actions(a: Dict[str, Any]) -> None:
     """
     Remove potentially disruptive menu/system actions.
     Mutates the action dict.
@@ -246,20 +316,91 @@ def json_ready_action(action: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def dump_action_record(action: Dict[str, Any], step: int, substep: int) -> bytes:
+    """
+    One JSONL line for an executed action. orjson serializes the numpy
+    entries directly; the stdlib path converts them to lists first.
+    """
+    record = {**action, "step": step, "substep": substep}
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(json_ready_action(record)).encode() + b"\n"
+
+
+class OutputWriter:
+    """
+    Daemon thread that owns the actions log and debug PNG writes, so disk
+    latency never stalls the env-step cadence. When the queue is full, PNGs
+    are dropped; JSONL records block instead of being lost.
+    """
+
+    def __init__(self, f_actions, maxsize: int = 256) -> None:
+        self._f_actions = f_actions
+        self._queue: "queue.Queue[Tuple[str, Any, Any] | None]" = queue.Queue(maxsize=maxsize)
+        self.dropped_pngs = 0
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def write_records(self, data: bytes) -> None:
+        if data:
+            self._queue.put(("jsonl", data, None))
+
+    def write_png(self, path: str, img_bgr: np.ndarray) -> None:
+        """`img_bgr` must not be reused by the caller after this call."""
+        try:
+            self._queue.put_nowait(("png", path, img_bgr))
+        except queue.Full:
+            self.dropped_pngs += 1
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped_pngs:
+            print(f"Dropped {self.dropped_pngs} debug PNGs (writer queue full).")
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            kind, target, payload = item
+            try:
+                if kind == "jsonl":
+                    self._f_actions.write(target)
+                else:
+                    cv2.imwrite(target, payload, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            except Exception as e:
+                print(f"Output writer error ({kind}): {e}")
+
+
 # -----------------------------
 # Game-specific init helpers
 # -----------------------------
-def press_button(env: GameEnv, button: str, hold_s: float = 0.05) -> None:
+ButtonBinding = Tuple[Callable[[str], None], Callable[[str], None], Callable[[], None]]
+
+
+def bind_controller_buttons(env: GameEnv) -> ButtonBinding | None:
+    """
+    Resolve the controller's press/release/update methods once, or None
+    if the controller cannot press buttons.
+    """
     controller = getattr(env, "controller", None)
-    if controller is None or not hasattr(controller, "press_button"):
-        return
-    controller.press_button(button)
-    if hasattr(controller, "gamepad"):
-        controller.gamepad.update()
+    try:
+        press, release = controller.press_button, controller.release_button
+    except AttributeError:
+        return None
+    gamepad = getattr(controller, "gamepad", None)
+    update = getattr(gamepad, "update", None) or (lambda: None)
+    return press, release, update
+
+
+def press_button(binding: ButtonBinding, button: str, hold_s: float = 0.05) -> None:
+    press, release, update = binding
+    press(button)
+    update()
     time.sleep(hold_s)
-    controller.release_button(button)
-    if hasattr(controller, "gamepad"):
-        controller.gamepad.update()
+    release(button)
+    update()
 
 
 def maybe_initialize_controller_menu(env: GameEnv, process_name: str) -> None:
@@ -290,10 +431,14 @@ def maybe_initialize_controller_menu(env: GameEnv, process_name: str) -> None:
         print(f"{3 - i}...")
         time.sleep(1)
 
+    binding = bind_controller_buttons(env)
+    if binding is None:
+        return
+
     # Simple init sequence: SOUTH then several EAST presses.
-    press_button(env, "SOUTH")
+    press_button(binding, "SOUTH")
     for _ in range(5):
-        press_button(env, "EAST")
+        press_button(binding, "EAST")
         time.sleep(0.3)
 
 
@@ -317,16 +462,6 @@ def parse_args() -> argparse.Namespace:
         default=env_flag("NG_PICK_PROCESS", False),
         help="Open a process selection menu at startup.",
     )
-
-
-def km_action_template() -> Dict[str, Any]:
-    return {
-        "keys": [],
-        "mouse_dx": 0,
-        "mouse_dy": 0,
-        "mouse_buttons": [],
-        "mouse_wheel": 0,
-    }
     parser.add_argument(
         "--controller",
         type=str,
@@ -458,6 +593,13 @@ def km_action_template() -> Dict[str, Any]:
         default=os.getenv("NG_FFMPEG_PRESET", "medium"),
         help="FFmpeg preset for videos (default: NG_FFMPEG_PRESET or medium)",
     )
+    parser.add_argument(
+        "--video-codec",
+        type=str,
+        default=os.getenv("NG_VIDEO_CODEC", "h264"),
+        help="Video encoder, e.g. h264, h264_nvenc, h264_qsv (default: NG_VIDEO_CODEC or h264). "
+        "Hardware encoders fall back to h264 if unavailable.",
+    )
     parser.add_argument(
         "--warmup-countdown",
         type=int,
@@ -528,6 +670,7 @@ def main() -> int:
         time.sleep(1)
 
     stop_file = Path(args.stop_file)
+    stop_event = watch_stop_file(stop_file)
 
     env = GameEnv(
         game=args.process,
@@ -552,25 +695,43 @@ def main() -> int:
 
         step_count = 0
         token_set = BUTTON_ACTION_TOKENS
-
-        with open(path_actions, "a", buffering=1) as f_actions:
-            with VideoRecorder(str(path_mp4_debug), fps=int(args.env_fps), crf=int(args.debug_crf), preset=args.preset) as debug_recorder:
-                with VideoRecorder(str(path_mp4_clean), fps=int(args.env_fps), crf=int(args.clean_crf), preset=args.preset) as clean_recorder:
+        debug_png_every = max(1, args.debug_png_every)
+        debug_prefix = os.fspath(path_debug) + os.sep
+
+        # Reused resize targets for the recorders (encoding copies each frame).
+        # The debug frame is the left region of the debug canvas, next to the
+        # prediction panel that create_viz draws.
+        clean_buf = np.empty((1080, 1920, 3), dtype=np.uint8)
+        debug_viz = np.empty((720, 1280 + 500, 3), dtype=np.uint8)
+        debug_frame = debug_viz[:, :1280]
+
+        # Block-buffered: records reach disk in 64 KiB writes (and on close),
+        # not with one syscall per executed action. Writes happen on the
+        # output writer thread.
+        with open(path_actions, "ab", buffering=65536) as f_actions:
+            writer = OutputWriter(f_actions)
+            with VideoRecorder(str(path_mp4_debug), fps=int(args.env_fps), crf=int(args.debug_crf), preset=args.preset, codec=args.video_codec) as debug_recorder:
+                with VideoRecorder(str(path_mp4_clean), fps=int(args.env_fps), crf=int(args.clean_crf), preset=args.preset, codec=args.video_codec) as clean_recorder:
+                    pending_records: list[bytes] = []
                     try:
                         while True:
-                            if stop_file.exists():
+                            if stop_event.is_set():
                                 print(f"Stop file detected at {stop_file}. Exiting loop.")
                                 break
 
                             # Preprocess observation for model
-                            obs_pil = preprocess_img(obs)
+                            obs_img = preprocess_img(obs)
 
                             # Optional PNG debug saving (throttled)
-                            if args.debug_png and (step_count % max(1, args.debug_png_every) == 0):
-                                obs_pil.save(path_debug / f"{step_count:05d}.png")
+                            if args.debug_png and (step_count % debug_png_every == 0):
+                                # cvtColor returns a new array, so the reused preprocess buffer is safe.
+                                writer.write_png(
+                                    f"{debug_prefix}{step_count:05d}.png",
+                                    cv2.cvtColor(obs_img, cv2.COLOR_RGB2BGR),
+                                )
 
                             # Predict action plan
-                            pred = policy.predict(obs_pil)
+                            pred = policy.predict(obs_img)
 
                             # Build actions
                             env_actions = build_env_actions(
@@ -593,42 +754,55 @@ def main() -> int:
                                         axis_deadzone=float(args.km_deadzone),
                                         mouse_max=int(args.km_mouse_max),
                                         trigger_threshold=float(args.km_trigger_thres),
+                                        key_list=env.km_key_list,
+                                        mouse_button_list=env.km_mouse_buttons,
                                     )
                                     exec_actions.append(km_action)
                                 else:
                                     exec_actions.append(a)
 
-                            # Execute actions
-                            print(
-                                f"Executing {len(exec_actions)} actions; each repeated {action_downsample_ratio} times"
-                            )
+                            # Execute actions (logged once per 60 plans; stdout can stall the loop)
+                            if step_count % 60 == 0:
+                                print(
+                                    f"Step {step_count}: executing {len(exec_actions)} actions; "
+                                    f"each repeated {action_downsample_ratio} times"
+                                )
 
                             stop_requested = False
                             for sub_i, a in enumerate(exec_actions):
-                                if stop_file.exists():
+                                if stop_event.is_set():
                                     print(f"Stop file detected at {stop_file}. Exiting loop.")
                                     stop_requested = True
                                     break
 
+                                # The prediction panel only depends on sub_i, so it is drawn
+                                # once per substep; repeats just resize the new frame next to it.
+                                panel_drawn = False
                                 for _ in range(action_downsample_ratio):
-                                    if stop_file.exists():
+                                    if stop_event.is_set():
                                         print(f"Stop file detected at {stop_file}. Exiting loop.")
                                         stop_requested = True
                                         break
                                     obs, reward, terminated, truncated, info = env.step(action=a)
 
                                     # Visualization frames
-                                    obs_viz = np.array(obs).copy()
-
-                                    clean_viz = cv2.resize(obs_viz, (1920, 1080), interpolation=cv2.INTER_AREA)
-                                    debug_viz = create_viz(
-                                        cv2.resize(obs_viz, (1280, 720), interpolation=cv2.INTER_AREA),
-                                        sub_i,
-                                        pred["j_left"],
-                                        pred["j_right"],
-                                        pred["buttons"],
-                                        token_set=token_set,
-                                    )
+                                    obs_viz = np.asarray(obs)
+
+                                    clean_viz = resize_frame(obs_viz, clean_buf)
+                                    resized = resize_frame(obs_viz, debug_frame)
+                                    if resized is not debug_frame:
+                                        debug_frame[...] = resized
+                                    if not panel_drawn:
+                                        create_viz(
+                                            debug_frame,
+                                            sub_i,
+                                            pred["j_left"],
+                                            pred["j_right"],
+                                            pred["buttons"],
+                                            token_set=token_set,
+                                            out=debug_viz,
+                                        )
+                                        panel_drawn = True
 
                                     debug_recorder.add_frame(debug_viz)
                                     clean_recorder.add_frame(clean_viz)
@@ -636,18 +810,24 @@ def main() -> int:
                                 if stop_requested:
                                     break
 
-                                # Log the executed action as JSONL (without mutating `a`)
-                                record = json_ready_action(a)
-                                record["step"] = step_count
-                                record["substep"] = sub_i
-                                json.dump(record, f_actions)
-                                f_actions.write("\n")
+                                # Log the executed action as JSONL (without mutating `a`);
+                                # KM masks are logged as key/button names.
+                                if args.controller == "km":
+                                    a = km_action_names(a, env.km_key_list, env.km_mouse_buttons)
+                                pending_records.append(dump_action_record(a, step_count, sub_i))
+
+                            # One write per action plan.
+                            writer.write_records(b"".join(pending_records))
+                            pending_records.clear()
 
                             step_count += 1
                             if stop_requested:
                                 break
 
                     finally:
+                        # Keep the records of a plan cut short by an error or Ctrl+C.
+                        writer.write_records(b"".join(pending_records))
+                        writer.close()
                         env.unpause()
 
     except KeyboardInterrupt:
@@ -5,13 +5,27 @@ Record keyboard+mouse actions with matching frames for KM training data.
 from __future__ import annotations
 
 import os
+import sys
 import time
 import json
+import queue
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
-import numpy as np
+from PIL import Image
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - only needed for --format msgpack
+    msgpack = None
 
 from nitrogen.game_env import GameEnv
 from nitrogen.shared import PATH_REPO
@@ -42,6 +56,49 @@ def env_flag(name: str, default: bool = False) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+THREAD_PRIORITY_ABOVE_NORMAL = 1
+
+
+def set_thread_priority(priority: int) -> Optional[int]:
+    """
+    Set the calling thread's Win32 priority and return the previous one, or
+    None when unavailable (non-Windows, or the call failed).
+    """
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.GetCurrentThread.restype = wintypes.HANDLE
+    kernel32.GetThreadPriority.argtypes = (wintypes.HANDLE,)
+    kernel32.GetThreadPriority.restype = ctypes.c_int
+    kernel32.SetThreadPriority.argtypes = (wintypes.HANDLE, ctypes.c_int)
+    kernel32.SetThreadPriority.restype = wintypes.BOOL
+    thread = kernel32.GetCurrentThread()
+    previous = kernel32.GetThreadPriority(thread)
+    if not kernel32.SetThreadPriority(thread, priority):
+        return None
+    return previous
+
+
+def watch_stop_file(stop_file: Path, interval: float = 0.25) -> threading.Event:
+    """
+    Return an event that gets set once `stop_file` exists, polled from a
+    daemon thread so the capture loop never stats it itself.
+    """
+    stop_event = threading.Event()
+
+    def poll() -> None:
+        while not stop_file.exists():
+            if stop_event.wait(interval):
+                return
+        stop_event.set()
+
+    threading.Thread(target=poll, name="stop-file", daemon=True).start()
+    return stop_event
+
+
 def next_run_dir(base: Path) -> Path:
     base.mkdir(parents=True, exist_ok=True)
     run_id = time.strftime("%Y%m%d_%H%M%S")
@@ -50,6 +107,152 @@ def next_run_dir(base: Path) -> Path:
     return path
 
 
+def dump_record(action: dict) -> bytes:
+    """One compact JSONL line; orjson when available, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.dumps(action, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(action, separators=(",", ":")) + "\n").encode()
+
+
+def make_jsonl_formatter(
+    keys: list[str],
+    mouse_buttons: list[str],
+    frame_field: Optional[str],
+) -> Callable[[dict], bytes]:
+    """
+    JSONL serializer specialized for the recorder's fixed record layout, for
+    when orjson is missing: one precompiled bytes %-template with the field
+    names and the fixed-length state vectors baked in, so each frame only
+    substitutes values. Output matches dump_record() byte for byte.
+    """
+    key_json = {key: json.dumps(key).encode() for key in keys}
+    button_json = {button: json.dumps(button).encode() for button in mouse_buttons}
+    template = (
+        b'{"timestamp":%b,"keys":[%b],"keys_vec":['
+        + b",".join([b"%d"] * len(keys))
+        + b'],"mouse_buttons":[%b],"mouse_buttons_vec":['
+        + b",".join([b"%d"] * len(mouse_buttons))
+        + b'],"mouse_dx":%d,"mouse_dy":%d,"mouse_wheel":%d,"mouse_pos":[%d,%d],"frame_index":%d'
+    )
+    if frame_field == "frame":
+        template += b',"frame":%b'
+    elif frame_field == "video_frame":
+        template += b',"video_frame":%d'
+    template += b"}\n"
+
+    def format_record(action: dict) -> bytes:
+        values = (
+            repr(action["timestamp"]).encode(),
+            b",".join([key_json[key] for key in action["keys"]]),
+            *action["keys_vec"],
+            b",".join([button_json[button] for button in action["mouse_buttons"]]),
+            *action["mouse_buttons_vec"],
+            action["mouse_dx"],
+            action["mouse_dy"],
+            action["mouse_wheel"],
+            *action["mouse_pos"],
+            action["frame_index"],
+        )
+        if frame_field == "frame":
+            values += (json.dumps(action["frame"]).encode(),)
+        elif frame_field == "video_frame":
+            values += (action["video_frame"],)
+        return template % values
+
+    return format_record
+
+
+def make_record_encoder(
+    fmt: str,
+    keys: list[str],
+    mouse_buttons: list[str],
+    frame_field: Optional[str],
+) -> Callable[[dict], bytes]:
+    """
+    Serializer for the action log: JSONL lines, or msgpack records framed as
+    a 4-byte little-endian length followed by the payload.
+    """
+    if fmt != "msgpack":
+        if orjson is not None:
+            return dump_record
+        return make_jsonl_formatter(keys, mouse_buttons, frame_field)
+    packer = msgpack.Packer(use_bin_type=True)
+
+    def encode(action: dict) -> bytes:
+        payload = packer.pack(action)
+        return len(payload).to_bytes(4, "little") + payload
+
+    return encode
+
+
+def iter_msgpack_records(path: Path) -> Iterator[dict]:
+    """Read back an actions.msgpack log; a truncated final record is skipped."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            size = int.from_bytes(header, "little")
+            payload = f.read(size)
+            if len(payload) < size:
+                return
+            yield msgpack.unpackb(payload, raw=False)
+
+
+class ActionLogWriter:
+    """
+    Daemon thread that appends serialized records to the action log in
+    batches: once 64 KiB is pending or a second has passed, so the
+    capture loop never blocks on disk.
+    """
+
+    def __init__(self, path: Path, flush_bytes: int = 65536, flush_s: float = 1.0) -> None:
+        self._path = path
+        self._flush_bytes = flush_bytes
+        self._flush_s = flush_s
+        self._queue: "queue.SimpleQueue[bytes | None]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="action-log", daemon=True)
+        self._thread.start()
+
+    def put(self, record: bytes) -> None:
+        self._queue.put(record)
+
+    def close(self) -> None:
+        """Write everything queued so far and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        buf = bytearray()
+        last_write = time.monotonic()
+        with open(self._path, "ab") as f:
+            while True:
+                try:
+                    record = self._queue.get(timeout=self._flush_s)
+                except queue.Empty:
+                    record = b""
+                if record is None:
+                    break
+                buf += record
+                now = time.monotonic()
+                if buf and (len(buf) >= self._flush_bytes or now - last_write >= self._flush_s):
+                    f.write(buf)
+                    f.flush()
+                    buf.clear()
+                    last_write = now
+            f.write(buf)
+
+
+def save_png(image: Image.Image, path: str, slots: threading.Semaphore) -> None:
+    """Pool task: write one frame (zlib level 1) and free its queue slot."""
+    try:
+        image.save(path, compress_level=1)
+    except Exception as exc:
+        print(f"Failed to save {path}: {exc}")
+    finally:
+        slots.release()
+
+
 def parse_args() -> argparse.Namespace:
     load_dotenv_if_available()
 
@@ -127,6 +330,13 @@ def parse_args() -> argparse.Namespace:
         default=os.getenv("NG_STOP_FILE", str(PATH_REPO / "STOP")),
         help="Stop recording when this file exists.",
     )
+    parser.add_argument(
+        "--key-poll-ms",
+        type=float,
+        default=float(os.getenv("NG_RECORD_KEY_POLL_MS", "0")),
+        help="Poll keys/buttons on a background thread every N ms and record anything pressed "
+        "since the previous frame (0 = sample once per frame, default: NG_RECORD_KEY_POLL_MS or 0).",
+    )
     raw_group = parser.add_mutually_exclusive_group()
     raw_group.add_argument(
         "--raw-mouse",
@@ -159,7 +369,23 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--no-png",
         action="store_true",
-        help="Do not save PNG frames (actions still recorded).",
+        help="Do not save frames at all (actions still recorded).",
+    )
+    parser.add_argument(
+        "--codec",
+        type=str,
+        default=os.getenv("NG_RECORD_CODEC", "png").lower(),
+        choices=["png", "ffv1", "x264"],
+        help="Frame storage: per-frame PNGs, one lossless ffv1 video (frames.mkv) "
+        "or one near-lossless x264 video at CRF 15 (frames.mp4). Default: NG_RECORD_CODEC or png.",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=os.getenv("NG_RECORD_FORMAT", "jsonl").lower(),
+        choices=["jsonl", "msgpack"],
+        help="Action log format: JSONL lines (actions.jsonl) or length-prefixed msgpack "
+        "records (actions.msgpack). Default: NG_RECORD_FORMAT or jsonl.",
     )
     parser.add_argument(
         "--video",
@@ -185,7 +411,10 @@ def parse_args() -> argparse.Namespace:
         help="Countdown seconds before start (default: NG_WARMUP_COUNTDOWN or 3).",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.format == "msgpack" and msgpack is None:
+        parser.error("--format msgpack requires the msgpack package")
+    return args
 
 
 def main() -> int:
@@ -211,15 +440,18 @@ def main() -> int:
     out_base = Path(args.out).expanduser().resolve()
     run_dir = next_run_dir(out_base)
     frames_dir = run_dir / "frames"
-    if not args.no_png:
+    save_png_frames = not args.no_png and args.codec == "png"
+    if save_png_frames:
         frames_dir.mkdir(parents=True, exist_ok=True)
-    actions_path = run_dir / "actions.jsonl"
+    frames_video_path = run_dir / ("frames.mkv" if args.codec == "ffv1" else "frames.mp4")
+    actions_path = run_dir / ("actions.msgpack" if args.format == "msgpack" else "actions.jsonl")
     meta_path = run_dir / "meta.json"
     video_path = run_dir / "preview.mp4"
 
     stop_file = Path(args.stop_file).expanduser()
     fps = int(args.fps)
-    step_s = 1.0 / max(1, fps)
+    tick_hz = max(1, fps)
+    step_ns = 1_000_000_000 // tick_hz
 
     env = GameEnv(
         game=args.process,
@@ -242,8 +474,13 @@ def main() -> int:
         "mouse_buttons": mouse_buttons,
         "screenshot_backend": args.screenshot_backend,
         "frames_saved": not args.no_png,
+        "frames_codec": args.codec,
+        "frames_video": None if args.no_png or args.codec == "png" else frames_video_path.name,
         "raw_mouse": bool(args.raw_mouse),
         "raw_focus_only": bool(args.raw_focus_only),
+        "key_poll_ms": float(args.key_poll_ms),
+        "actions_format": args.format,
+        "actions_file": actions_path.name,
         "created_at": time.time(),
     }
     meta_path.write_text(json.dumps(meta, indent=2))
@@ -261,7 +498,12 @@ def main() -> int:
             print(f"Raw mouse input unavailable, falling back to cursor deltas: {exc}")
             raw_mouse = None
 
-    km_state = KeyboardMouseState(keys=key_list, mouse_buttons=mouse_buttons, raw_mouse=raw_mouse)
+    km_state = KeyboardMouseState(
+        keys=key_list,
+        mouse_buttons=mouse_buttons,
+        raw_mouse=raw_mouse,
+        key_poll_interval=float(args.key_poll_ms) / 1000.0 if args.key_poll_ms > 0 else None,
+    )
 
     print(f"Recording to {run_dir}")
     print(f"Keys tracked: {len(key_list)}")
@@ -271,52 +513,113 @@ def main() -> int:
         print(f"{i}...")
         time.sleep(1)
 
-    start_time = time.time()
+    # Integer nanosecond schedule: tick k is at origin + k * 1e9 / fps,
+    # computed exactly instead of accumulating a float step.
+    start_ns = time.perf_counter_ns()
+    tick_origin_ns = start_ns
+    tick_origin_idx = 0
     frame_idx = 0
-    next_tick = time.perf_counter()
     max_frames = int(args.max_frames)
-    duration = float(args.duration)
+    duration_ns = int(float(args.duration) * 1_000_000_000)
 
     recorder: Optional[VideoRecorder] = None
     if args.video:
         recorder = VideoRecorder(str(video_path), fps=fps, crf=int(args.video_crf), preset=args.preset)
 
-    try:
-        with open(actions_path, "a", buffering=1) as f_actions:
-            while True:
-                if stop_file.exists():
-                    print(f"Stop file detected at {stop_file}. Stopping.")
-                    break
-                if max_frames > 0 and frame_idx >= max_frames:
-                    break
-                if duration > 0 and (time.time() - start_time) >= duration:
-                    break
-
-                action = km_state.sample()
-                action["frame_index"] = frame_idx
+    # Video frame storage: one encoded stream instead of a file per frame;
+    # records carry the frame's index in the stream.
+    frames_recorder: Optional[VideoRecorder] = None
+    if not args.no_png and args.codec != "png":
+        if args.codec == "ffv1":
+            frames_recorder = VideoRecorder(str(frames_video_path), fps=fps, codec="ffv1")
+        else:
+            frames_recorder = VideoRecorder(str(frames_video_path), fps=fps, crf=15, preset=args.preset)
+
+    # PNG encoding runs on a small pool (zlib releases the GIL); the slots
+    # bound how many frames can wait, so a slow disk throttles capture
+    # instead of growing memory.
+    png_pool: Optional[ThreadPoolExecutor] = None
+    png_workers = min(4, os.cpu_count() or 1)
+    png_slots = threading.Semaphore(png_workers * 2)
+    if save_png_frames:
+        png_pool = ThreadPoolExecutor(max_workers=png_workers, thread_name_prefix="png")
+
+    stop_event = watch_stop_file(stop_file)
+
+    # Plain string prefixes, so saving a frame builds no Path objects. The
+    # recorded path is POSIX-style ("frames/000000.png") on every OS, so
+    # datasets recorded on Windows load unchanged elsewhere.
+    frames_prefix = os.fspath(frames_dir) + os.sep
+    frame_rel_prefix = frames_dir.relative_to(run_dir).as_posix() + "/"
+
+    # Records are written in batches on the writer thread. The action dict
+    # is refilled in place each frame, so it is serialized before queueing.
+    action_log = ActionLogWriter(actions_path)
+    frame_field = "frame" if save_png_frames else ("video_frame" if frames_recorder is not None else None)
+    encode_record = make_record_encoder(args.format, km_state.keys, km_state.mouse_buttons, frame_field)
+    action: dict = {}
+
+    # GameEnv has already raised the timer period to 1 ms and paces with a
+    # high-resolution waitable timer; keeping the capture thread above the
+    # encoder/writer threads keeps its wakeups on schedule under load.
+    previous_priority = set_thread_priority(THREAD_PRIORITY_ABOVE_NORMAL)
 
-                frame = env.render()
-
-                if not args.no_png:
-                    frame_path = frames_dir / f"{frame_idx:06d}.png"
-                    frame.save(frame_path)
-                    action["frame"] = str(frame_path.relative_to(run_dir))
-
-                if recorder is not None:
-                    recorder.add_frame(np.array(frame))
-
-                json.dump(action, f_actions)
-                f_actions.write("\n")
-
-                frame_idx += 1
-                next_tick += step_s
-                sleep_s = next_tick - time.perf_counter()
-                if sleep_s > 0:
-                    time.sleep(sleep_s)
+    try:
+        while True:
+            if stop_event.is_set():
+                print(f"Stop file detected at {stop_file}. Stopping.")
+                break
+            if max_frames > 0 and frame_idx >= max_frames:
+                break
+
+            km_state.sample_into(action)
+            action["frame_index"] = frame_idx
+
+            frame = env.render()
+
+            if save_png_frames:
+                frame_name = f"{frame_idx:06d}.png"
+                # fromarray copies the RGB frame, so the reused render buffer is safe.
+                png_slots.acquire()
+                png_pool.submit(save_png, Image.fromarray(frame), frames_prefix + frame_name, png_slots)
+                action["frame"] = frame_rel_prefix + frame_name
+
+            if frames_recorder is not None:
+                frames_recorder.add_frame(frame)
+                action["video_frame"] = frame_idx
+
+            if recorder is not None:
+                recorder.add_frame(frame)
+
+            action_log.put(encode_record(action))
+
+            frame_idx += 1
+            next_tick_ns = tick_origin_ns + (frame_idx - tick_origin_idx) * 1_000_000_000 // tick_hz
+            now_ns = time.perf_counter_ns()
+            # One clock read per frame: the duration check uses the time
+            # the next frame would be captured at.
+            if duration_ns > 0 and max(now_ns, next_tick_ns) - start_ns >= duration_ns:
+                break
+            sleep_ns = next_tick_ns - now_ns
+            if sleep_ns > 0:
+                env.sleep(sleep_ns / 1e9)
+            elif sleep_ns < -step_ns:
+                # More than a frame behind: restart the schedule from now
+                # rather than capturing a burst of frames to catch up.
+                tick_origin_ns = now_ns
+                tick_origin_idx = frame_idx
 
     finally:
+        if previous_priority is not None:
+            set_thread_priority(previous_priority)
+        action_log.close()
+        if png_pool is not None:
+            png_pool.shutdown(wait=True)
+        km_state.close()
         if raw_mouse is not None:
             raw_mouse.stop()
+        if frames_recorder is not None:
+            frames_recorder.close()
         if recorder is not None:
             recorder.close()
         env.close()
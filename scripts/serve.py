@@ -1,12 +1,15 @@
 import os
 import argparse
-import pickle
+import threading
 from pathlib import Path
 
 import zmq
 
+from nitrogen.inference_client import pack_message, unpack_message
 from nitrogen.inference_session import InferenceSession
 
+WORKERS_ENDPOINT = "inproc://workers"
+
 
 def _load_dotenv_if_available() -> None:
     """
@@ -49,6 +52,61 @@ def _resolve_ckpt_path(cli_ckpt: str | None) -> str:
     )
 
 
+def _handle_request(session: InferenceSession, request: dict) -> dict:
+    rtype = request.get("type")
+    try:
+        if rtype == "reset":
+            session.reset()
+            print("Session reset")
+            return {"status": "ok"}
+
+        if rtype == "info":
+            info = session.info()
+            print("Sent session info")
+            return {"status": "ok", "info": info}
+
+        if rtype == "predict":
+            if "image" not in request:
+                return {"status": "error", "message": "Missing field: image"}
+            return {"status": "ok", "pred": session.predict(request["image"])}
+
+        return {"status": "error", "message": f"Unknown request type: {rtype}"}
+
+    except Exception as e:
+        # Catch inference-time errors so the server doesn't die
+        return {"status": "error", "message": f"Server error: {e}"}
+
+
+def _serve_worker(context: zmq.Context, session: InferenceSession) -> None:
+    """REP worker behind the DEALER; exits when the context is terminated."""
+    socket = context.socket(zmq.REP)
+    socket.connect(WORKERS_ENDPOINT)
+    try:
+        while True:
+            # copy=False: the image array is a view of the received frame.
+            frames = socket.recv_multipart(copy=False)
+            try:
+                request = unpack_message(frames)
+            except Exception as e:
+                socket.send_multipart(pack_message({"status": "error", "message": f"Bad request payload: {e}"}))
+                continue
+            socket.send_multipart(pack_message(_handle_request(session, request)), copy=False)
+    except zmq.ContextTerminated:
+        pass
+    finally:
+        socket.close(linger=0)
+
+
+def _run_proxy(frontend: zmq.Socket, backend: zmq.Socket) -> None:
+    try:
+        zmq.proxy(frontend, backend)
+    except zmq.ContextTerminated:
+        pass
+    finally:
+        frontend.close(linger=0)
+        backend.close(linger=0)
+
+
 def main() -> int:
     _load_dotenv_if_available()
 
@@ -72,14 +130,20 @@ def main() -> int:
         context_length=args.ctx,
     )
 
-    # Setup ZeroMQ
+    # Setup ZeroMQ: clients talk to a ROUTER, which a proxy thread forwards
+    # to the REP worker over inproc. Nothing spins while idle. There is a
+    # single worker on purpose: the session holds frame/action context, so
+    # spreading one client's requests over several sessions would split it.
     context = zmq.Context.instance()
-    socket = context.socket(zmq.REP)
-    socket.bind(f"tcp://*:{args.port}")
+    frontend = context.socket(zmq.ROUTER)
+    frontend.bind(f"tcp://*:{args.port}")
+    backend = context.socket(zmq.DEALER)
+    backend.bind(WORKERS_ENDPOINT)
 
-    # Create poller
-    poller = zmq.Poller()
-    poller.register(socket, zmq.POLLIN)
+    proxy_thread = threading.Thread(target=_run_proxy, args=(frontend, backend), name="zmq-proxy", daemon=True)
+    worker_thread = threading.Thread(target=_serve_worker, args=(context, session), name="worker", daemon=True)
+    proxy_thread.start()
+    worker_thread.start()
 
     print(f"\n{'='*60}")
     print(f"Server running on port {args.port}")
@@ -87,56 +151,19 @@ def main() -> int:
     print(f"Waiting for requests...")
     print(f"{'='*60}\n")
 
+    # The main thread only waits for Ctrl+C (or the proxy dying); a timed
+    # join keeps it interruptible on Windows.
     try:
-        while True:
-            # Poll with timeout to allow Ctrl+C handling
-            events = dict(poller.poll(timeout=100))
-            if socket not in events or events[socket] != zmq.POLLIN:
-                continue
-
-            try:
-                raw = socket.recv()
-                request = pickle.loads(raw)
-            except Exception as e:
-                socket.send(pickle.dumps({"status": "error", "message": f"Bad request payload: {e}"}))
-                continue
-
-            rtype = request.get("type")
-            try:
-                if rtype == "reset":
-                    session.reset()
-                    response = {"status": "ok"}
-                    print("Session reset")
-
-                elif rtype == "info":
-                    info = session.info()
-                    response = {"status": "ok", "info": info}
-                    print("Sent session info")
-
-                elif rtype == "predict":
-                    if "image" not in request:
-                        response = {"status": "error", "message": "Missing field: image"}
-                    else:
-                        result = session.predict(request["image"])
-                        response = {"status": "ok", "pred": result}
-
-                else:
-                    response = {"status": "error", "message": f"Unknown request type: {rtype}"}
-
-            except Exception as e:
-                # Catch inference-time errors so the server doesn't die
-                response = {"status": "error", "message": f"Server error: {e}"}
-
-            socket.send(pickle.dumps(response))
-
+        while proxy_thread.is_alive():
+            proxy_thread.join(timeout=1.0)
+        return 1
     except KeyboardInterrupt:
         print("\nShutting down server...")
         return 0
     finally:
-        try:
-            socket.close(linger=0)
-        finally:
-            context.term()
+        # Terminating the context unblocks the proxy and workers, which
+        # close their sockets and exit.
+        context.term()
 
 
 if __name__ == "__main__":